@@ -0,0 +1,220 @@
+"""
+End-to-end throughput benchmark that runs fully offline.
+
+Synthetic exam PDFs of 10, 100 and 1000 pages are generated and extracted with
+extractor.extract_pdf, with Gemini replaced by model_clients.ReplayModelClient. The fake
+serves a --record-responses recording (or synthesized questions without one) with the
+given latency and error rate. With --upload, the extracted questions are then posted
+with automator.upload_questions_http to the local stub_site.py server.
+
+Each PDF is processed in a fresh child process, so the reported peak RSS belongs to
+that run alone:
+
+    python benchmarks/end_to_end.py
+    python benchmarks/end_to_end.py --sizes 10 100 --latency-ms 800 --error-rate 0.05 --upload
+    python benchmarks/end_to_end.py --recording soalat_responses.jsonl --json e2e.json
+
+Rendering needs poppler (pdftoppm) in PATH, as for extractor.py itself.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000]
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+PAGE_TEMPLATES = 8  # Distinct synthetic pages; longer PDFs repeat them
+QUESTIONS_PER_PAGE = 5
+RESULT_PREFIX = "E2E_RESULT "
+
+
+# --- Synthetic PDFs ---
+def draw_text_line(draw, rng, left, right, y, height=22):
+    """Draws a line of word-sized blocks from right to left, like a line of Persian text."""
+    x = right
+    while x > left + 60:
+        width = rng.randint(30, 140)
+        draw.rectangle([x - width, y, x, y + height], fill=30)
+        x -= width + rng.randint(12, 20)
+
+
+def make_page_template(rng):
+    page = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    margin = 100
+    y = 120
+    for _ in range(QUESTIONS_PER_PAGE):
+        for _ in range(rng.randint(1, 3)):
+            draw_text_line(draw, rng, margin, PAGE_SIZE[0] - margin, y)
+            y += 40
+        for _ in range(4):
+            draw.ellipse([PAGE_SIZE[0] - margin - 20, y + 2, PAGE_SIZE[0] - margin, y + 22], outline=30, width=3)
+            draw_text_line(draw, rng, PAGE_SIZE[0] // 2, PAGE_SIZE[0] - margin - 40, y)
+            y += 36
+        y += 50
+    return page
+
+
+def make_synthetic_pdf(path, page_count, seed=0):
+    rng = random.Random(seed)
+    templates = [make_page_template(rng) for _ in range(min(PAGE_TEMPLATES, page_count))]
+    pages = [templates[index % len(templates)] for index in range(page_count)]
+    pages[0].save(path, "PDF", resolution=150, save_all=True, append_images=pages[1:])
+
+
+def peak_rss_bytes(children=False):
+    """Peak resident set size of this process (or of its finished child processes), or None."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        if children:
+            return None
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# --- One run (inside the child process) ---
+def upload_with_stub_site(json_file, workers, latency_ms, error_rate, ledger_path):
+    from question_extractor import automator, stub_site
+
+    server, site = stub_site.make_server("127.0.0.1", 0, latency_ms / 1000, error_rate, seed=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site_url = f"http://127.0.0.1:{server.server_address[1]}"
+    automator.LOGIN_URL = automator.replace_site(automator.LOGIN_URL, site_url)
+    automator.CREATE_QUESTION_URL = automator.replace_site(automator.CREATE_QUESTION_URL, site_url)
+    automator.tag_cache.enabled = False
+    automator.TAGS_TO_ADD = []  # The --http mode needs cached tag IDs, which the benchmark does not resolve
+    automator.upload_ledger = automator.UploadLedger(ledger_path)
+    automator.upload_ledger.resume = False
+    started = time.perf_counter()
+    try:
+        automator.upload_questions_http(json_file, workers)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {"upload_seconds": time.perf_counter() - started, "uploaded": len(site.questions),
+            "upload_failed_posts": site.failed_posts}
+
+
+def run_single(args):
+    from question_extractor import extractor
+    from question_extractor.model_clients import ReplayModelClient
+
+    extractor.model_client = ReplayModelClient(args.recording, args.latency_ms, args.jitter_ms, args.error_rate,
+                                               args.error_kind, QUESTIONS_PER_PAGE,
+                                               answer_key_size=args.pages * QUESTIONS_PER_PAGE, seed=1)
+    extractor.response_cache.enabled = False
+    extractor.api_rate_limiter = extractor.TokenBucketRateLimiter(args.requests_per_minute,
+                                                                  burst=extractor.MAX_WORKERS)
+    extractor.retry_scheduler = extractor.RetryScheduler(base_delay=args.retry_delay, max_delay=args.retry_delay * 8)
+    started = time.perf_counter()
+    summary = extractor.extract_pdf(args.single, args.pages * QUESTIONS_PER_PAGE, answer_key_page_number=0,
+                                    answers_are_bolded=True, pages_per_request=args.pages_per_request)
+    result = {"pages": args.pages, "seconds": time.perf_counter() - started, "questions": summary["questions"],
+              "failed_pages": len(summary["failed_pages"]), "error": summary["error"]}
+    if args.upload and summary["output"]:
+        result.update(upload_with_stub_site(summary["output"], args.workers, args.site_latency_ms,
+                                            args.site_error_rate,
+                                            os.path.splitext(args.single)[0] + "_ledger.jsonl"))
+    result["peak_rss"] = peak_rss_bytes()
+    result["renderer_peak_rss"] = peak_rss_bytes(children=True)
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+# --- Driver ---
+def run_size(page_count, work_dir, args):
+    pdf_path = os.path.join(work_dir, f"synthetic_{page_count}.pdf")
+    if not os.path.exists(pdf_path):
+        print(f"Generating {pdf_path}...")
+        make_synthetic_pdf(pdf_path, page_count)
+    for suffix in ("_journal.jsonl", "_ledger.jsonl"):
+        stale_path = os.path.splitext(pdf_path)[0] + suffix
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+    command = [sys.executable, os.path.abspath(__file__), "--single", pdf_path, "--pages", str(page_count)]
+    for name in ("latency_ms", "jitter_ms", "error_rate", "error_kind", "requests_per_minute", "retry_delay",
+                 "pages_per_request", "workers", "site_latency_ms", "site_error_rate"):
+        command += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+    if args.recording:
+        command += ["--recording", args.recording]
+    if args.upload:
+        command.append("--upload")
+    print(f"Running {page_count} pages...")
+    completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    print(f"ERROR: The {page_count} page run did not finish (exit code {completed.returncode}). Last output:")
+    print("\n".join((completed.stdout + completed.stderr).splitlines()[-20:]))
+    return None
+
+
+def print_report(rows):
+    print(f"\n{'pages':>7}{'seconds':>10}{'pages/s':>10}{'questions':>11}{'q/s':>9}{'failed':>8}"
+          f"{'upload q/s':>12}{'peak RSS MB':>13}{'renderer MB':>13}")
+    for row in rows:
+        upload_rate = f"{row['uploaded'] / row['upload_seconds']:.1f}" if row.get("upload_seconds") else "-"
+        peak_rss = f"{row['peak_rss'] / 2 ** 20:.0f}" if row.get("peak_rss") else "-"
+        renderer_rss = f"{row['renderer_peak_rss'] / 2 ** 20:.0f}" if row.get("renderer_peak_rss") else "-"
+        print(f"{row['pages']:>7}{row['seconds']:>10.1f}{row['pages'] / row['seconds']:>10.2f}{row['questions']:>11}"
+              f"{row['questions'] / row['seconds']:>9.1f}{row['failed_pages']:>8}{upload_rate:>12}"
+              f"{peak_rss:>13}{renderer_rss:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end throughput benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="PDF sizes in pages.")
+    parser.add_argument("--work-dir", help="Where the synthetic PDFs and outputs are kept (default: a temp dir).")
+    parser.add_argument("--recording", help="Model responses recorded with extractor.py --record-responses.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fake model latency per request.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency, up to this much.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake model requests that fail.")
+    parser.add_argument("--error-kind", default="timeout",
+                        choices=["timeout", "quota", "empty_response", "malformed_json"])
+    parser.add_argument("--requests-per-minute", type=float, default=60000,
+                        help="Rate limit applied to the fake model (default: practically unlimited).")
+    parser.add_argument("--retry-delay", type=float, default=0.1, help="Base retry delay in seconds.")
+    parser.add_argument("--pages-per-request", type=int, default=1)
+    parser.add_argument("--upload", action="store_true",
+                        help="Also upload the extracted questions to a local stub_site.py over HTTP.")
+    parser.add_argument("--workers", type=int, default=8, help="HTTP upload workers.")
+    parser.add_argument("--site-latency-ms", type=float, default=0.0, help="Stub site latency per question post.")
+    parser.add_argument("--site-error-rate", type=float, default=0.0, help="Share of question posts answered 503.")
+    parser.add_argument("--json", help="Also write the report rows to this JSON file.")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    parser.add_argument("--pages", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args)
+        return
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="e2e_benchmark_")
+    os.makedirs(work_dir, exist_ok=True)
+    rows = []
+    for page_count in args.sizes:
+        row = run_size(page_count, work_dir, args)
+        if row is not None:
+            rows.append(row)
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Throughput micro-benchmark for the Persian text normalizer.
+
+Runs the previous per-call implementation of correct_common_spacing_errors (which
+rebuilt its regular expressions and made six passes on every call) against
+PersianTextNormalizer.normalize and PersianTextNormalizer.normalize_many on the same
+corpus, checks that the outputs agree and reports strings/s and MB/s.
+
+The corpus is every question and option string in the given extracted-questions JSON
+files, or a synthetic corpus when no files are given:
+
+    python benchmarks/normalizer_throughput.py soalat_extracted_questions.json
+    python benchmarks/normalizer_throughput.py --synthetic 200000
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_extractor.persian_text import VERB_STEMS_FOR_MI_NE, PersianTextNormalizer  # noqa: E402
+
+SYNTHETIC_WORDS = [
+    "می کند", "میشود", "نمی توانند", "میخواهد", "کتاب ها", "خانه ای", "آنها", "مییابد", "درس", "سوال",
+    "کدام", "گزینه", "صحیح", "است", "در", "این", "متن", "نویسنده", "می دانیم", "نمیگویند", "جمله ها",
+    "۱۲۳", "٤٥", "the", "following", "passage", "which", "of", "is", "true", "(This question has an image)",
+]
+
+
+# Implementation before PersianTextNormalizer, kept as the reference for output and speed
+def legacy_correct_common_spacing_errors(text):
+    if not text:
+        return ""
+    verb_stems_for_mi_ne = VERB_STEMS_FOR_MI_NE
+    text = re.sub(r'\b(می|نمی)\s+(' + verb_stems_for_mi_ne + r')\b', r'\1‌\2', text)  # ZWNJ
+    text = re.sub(r'\b(می|نمی)(' + verb_stems_for_mi_ne + r')\b', r'\1‌\2', text)  # ZWNJ
+    text = text.replace('مییابد', 'می‌یابد')
+    text = text.replace('میشود', 'می‌شود')
+    text = text.replace('آنها', 'آن‌ها')
+    text = re.sub(r'(\S)\s+(ها)\b', r'\1‌ها', text)
+    text = re.sub(r'(\S)\s+(ای)\b', r'\1‌ای', text)
+    return text
+
+
+def load_corpus(paths):
+    corpus = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+        for q in questions:
+            if isinstance(q.get("question"), str):
+                corpus.append(q["question"])
+            corpus.extend(opt for opt in q.get("options") or [] if isinstance(opt, str))
+    return corpus
+
+
+def synthetic_corpus(size, seed=1403):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SYNTHETIC_WORDS) for _ in range(rng.randint(3, 40))) for _ in range(size)]
+
+
+def measure(label, func, corpus, repeats):
+    best = float("inf")
+    output = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = func(corpus)
+        best = min(best, time.perf_counter() - started)
+    megabytes = sum(len(text.encode("utf-8")) for text in corpus) / 1e6
+    print(f"{label:<34}{best:>9.3f} s{len(corpus) / best:>14,.0f} strings/s{megabytes / best:>9.1f} MB/s")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Persian text normalizer.")
+    parser.add_argument("files", nargs="*", help="Extracted-questions JSON files used as the corpus.")
+    parser.add_argument("--synthetic", type=int, default=100000,
+                        help="Number of synthetic strings when no files are given (default: 100000).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per implementation (best is reported).")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.files) if args.files else synthetic_corpus(args.synthetic)
+    print(f"Corpus: {len(corpus):,} strings.\n")
+
+    normalizer = PersianTextNormalizer()
+    expected = measure("legacy correct_common_spacing_errors",
+                       lambda texts: [legacy_correct_common_spacing_errors(t) for t in texts], corpus, args.repeats)
+    per_string = measure("PersianTextNormalizer.normalize",
+                         lambda texts: [normalizer.normalize(t) for t in texts], corpus, args.repeats)
+    batched = measure("PersianTextNormalizer.normalize_many", normalizer.normalize_many, corpus, args.repeats)
+
+    for label, output in (("normalize", per_string), ("normalize_many", batched)):
+        mismatches = [i for i, (a, b) in enumerate(zip(expected, output)) if a != b]
+        print(f"\n{label}: {len(mismatches)} of {len(corpus):,} outputs differ from the legacy implementation.")
+        for i in mismatches[:3]:
+            print(f"  input:    {corpus[i][:120]!r}\n  legacy:   {expected[i][:120]!r}\n  new:      {output[i][:120]!r}")
+
+
+if __name__ == "__main__":
+    main()
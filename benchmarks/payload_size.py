@@ -0,0 +1,192 @@
+"""
+Compares page image preprocessing settings by payload size, encode time and
+extraction agreement.
+
+The benchmark runs over a fixed directory of recorded pages: page images
+(page_001.png, page_002.png, ...) plus, optionally, a reference extraction for each
+page (page_001.json) holding the question list Gemini returned for the full-quality
+image. Create the references once with --record-reference, then compare presets:
+
+    python benchmarks/payload_size.py recorded_pages/ --record-reference
+    python benchmarks/payload_size.py recorded_pages/ --extract
+
+Without --extract only bytes per page and encode time are measured (no API calls).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import difflib
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+from question_extractor import extractor  # noqa: E402
+
+# Settings of the original script: full colour, full size, PIL's default JPEG quality
+ORIGINAL_SETTINGS = {"grayscale": False, "autocrop": False, "max_long_edge": 0, "format": "JPEG", "quality": None}
+
+PRESETS = {
+    "original": ORIGINAL_SETTINGS,
+    "gray-jpeg85": {"grayscale": True, "autocrop": False, "max_long_edge": 0, "format": "JPEG", "quality": 85},
+    "gray-crop-jpeg85": {"grayscale": True, "autocrop": True, "crop_margin": 24, "max_long_edge": 0,
+                         "format": "JPEG", "quality": 85},
+    "gray-crop-2048-jpeg85": {"grayscale": True, "autocrop": True, "crop_margin": 24, "max_long_edge": 2048,
+                              "format": "JPEG", "quality": 85},
+    "gray-crop-1600-jpeg75": {"grayscale": True, "autocrop": True, "crop_margin": 24, "max_long_edge": 1600,
+                              "format": "JPEG", "quality": 75},
+    "gray-crop-2048-webp80": {"grayscale": True, "autocrop": True, "crop_margin": 24, "max_long_edge": 2048,
+                              "format": "WEBP", "quality": 80},
+    "gray-crop-1600-webp70": {"grayscale": True, "autocrop": True, "crop_margin": 24, "max_long_edge": 1600,
+                              "format": "WEBP", "quality": 70},
+}
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.webp')
+
+
+def load_recorded_pages(pages_dir):
+    pages = []
+    for filename in sorted(os.listdir(pages_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        reference_path = os.path.join(pages_dir, stem + '.json')
+        pages.append({"name": stem, "image_path": os.path.join(pages_dir, filename),
+                      "reference_path": reference_path})
+    return pages
+
+
+def text_similarity(a, b):
+    return difflib.SequenceMatcher(None, str(a or ""), str(b or "")).ratio()
+
+
+def question_agreement(extracted, reference):
+    """
+    Fraction of reference questions that were extracted with the same number, nearly
+    identical question and option texts, and the same correct_option.
+    """
+    if not reference:
+        return 1.0 if not extracted else 0.0
+    extracted_by_number = {}
+    for q in extracted or []:
+        try:
+            extracted_by_number[int(extractor.to_english_digits(q.get('number')))] = q
+        except (TypeError, ValueError):
+            continue
+    matched = 0
+    for ref_q in reference:
+        try:
+            q = extracted_by_number.get(int(extractor.to_english_digits(ref_q.get('number'))))
+        except (TypeError, ValueError):
+            continue
+        if q is None or text_similarity(q.get('question'), ref_q.get('question')) < 0.9:
+            continue
+        ref_options = ref_q.get('options') or []
+        options = q.get('options') or []
+        if len(options) != len(ref_options) or \
+                any(text_similarity(o, r) < 0.9 for o, r in zip(options, ref_options)):
+            continue
+        if ref_q.get('correct_option') is not None and q.get('correct_option') != ref_q.get('correct_option'):
+            continue
+        matched += 1
+    return matched / len(reference)
+
+
+def extract_with_settings(image, settings, page_name, total_questions, answers_are_bolded):
+    previous_settings = extractor.IMAGE_PREPROCESSING
+    extractor.IMAGE_PREPROCESSING = settings
+    try:
+        return extractor.get_json_from_image_gemini(image, page_name, total_questions, answers_are_bolded)
+    finally:
+        extractor.IMAGE_PREPROCESSING = previous_settings
+
+
+def record_references(pages, total_questions, answers_are_bolded):
+    for page in pages:
+        with Image.open(page["image_path"]) as image:
+            questions = extract_with_settings(image, ORIGINAL_SETTINGS, page["name"], total_questions,
+                                              answers_are_bolded)
+        if questions is None:
+            print(f"ERROR: Reference extraction failed for {page['name']}; no reference written.")
+            continue
+        with open(page["reference_path"], "w", encoding="utf-8") as f:
+            json.dump(questions, f, ensure_ascii=False, indent=2)
+        print(f"Reference for {page['name']} recorded ({len(questions)} questions).")
+
+
+def run_benchmark(pages, preset_names, extract, total_questions, answers_are_bolded, repeats):
+    rows = []
+    for preset_name in preset_names:
+        settings = PRESETS[preset_name]
+        sizes = []
+        encode_times = []
+        agreements = []
+        for page in pages:
+            with Image.open(page["image_path"]) as image:
+                image.load()
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    data, _mime = extractor.preprocess_page_image(image, settings)
+                    encode_times.append(time.perf_counter() - started)
+                sizes.append(len(data))
+                if extract and os.path.exists(page["reference_path"]):
+                    with open(page["reference_path"], "r", encoding="utf-8") as f:
+                        reference = json.load(f)
+                    extracted = extract_with_settings(image, settings, page["name"], total_questions,
+                                                      answers_are_bolded)
+                    agreements.append(question_agreement(extracted, reference))
+        rows.append({
+            "preset": preset_name,
+            "bytes_per_page": statistics.mean(sizes),
+            "encode_ms": statistics.median(encode_times) * 1000,
+            "agreement": statistics.mean(agreements) if agreements else None,
+        })
+    return rows
+
+
+def print_report(rows):
+    baseline = rows[0]["bytes_per_page"] if rows else 1
+    print(f"\n{'preset':<24}{'KB/page':>10}{'vs first':>10}{'encode ms':>11}{'agreement':>11}")
+    for row in rows:
+        agreement = f"{row['agreement'] * 100:.1f}%" if row["agreement"] is not None else "-"
+        print(f"{row['preset']:<24}{row['bytes_per_page'] / 1024:>10.1f}{row['bytes_per_page'] / baseline:>9.0%} "
+              f"{row['encode_ms']:>10.1f}{agreement:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page image preprocessing presets.")
+    parser.add_argument("pages_dir", help="Directory with recorded page images and reference JSON files.")
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS), choices=list(PRESETS),
+                        help="Presets to compare (default: all).")
+    parser.add_argument("--extract", action="store_true",
+                        help="Also send each preset to Gemini and measure agreement with the references.")
+    parser.add_argument("--record-reference", action="store_true",
+                        help="Extract every page with the original settings and store the result as reference.")
+    parser.add_argument("--total-questions", type=int, default=60)
+    parser.add_argument("--bold", action="store_true", help="Answers are marked in bold on question pages.")
+    parser.add_argument("--repeats", type=int, default=3, help="Encodes per page when timing.")
+    parser.add_argument("--json", help="Also write the report rows to this JSON file.")
+    args = parser.parse_args()
+
+    pages = load_recorded_pages(args.pages_dir)
+    if not pages:
+        print(f"ERROR: No page images found in '{args.pages_dir}'.")
+        return
+    print(f"{len(pages)} recorded pages loaded from '{args.pages_dir}'.")
+
+    if args.record_reference:
+        record_references(pages, args.total_questions, args.bold)
+        return
+
+    rows = run_benchmark(pages, args.presets, args.extract, args.total_questions, args.bold, args.repeats)
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    extractor.response_cache.print_stats()
+
+
+if __name__ == "__main__":
+    main()
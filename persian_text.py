@@ -0,0 +1,8 @@
+"""
+Persian text helpers. The code lives in question_extractor/persian_text.py; this module
+is kept so that `import persian_text` and `from persian_text import ...` keep working.
+"""
+import sys
+from question_extractor import persian_text
+
+sys.modules[__name__] = persian_text
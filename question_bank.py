@@ -0,0 +1,12 @@
+"""
+Command-line entry point of the question bank tool. The code lives in
+question_extractor/question_bank.py; this script runs its main(), and `import
+question_bank` keeps returning that module.
+"""
+import sys
+from question_extractor import question_bank
+
+if __name__ == "__main__":
+    question_bank.main()
+else:
+    sys.modules[__name__] = question_bank
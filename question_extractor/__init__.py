@@ -0,0 +1,19 @@
+"""
+Extracts multiple-choice questions from exam PDFs with Gemini (extractor) and uploads
+them to the question website (automator).
+
+Importing the package or any of its modules is cheap and has no side effects: pdf2image,
+PIL, google.generativeai, Selenium and requests are only imported when a function that
+needs them first runs, and the Gemini model is created once on the first request. Other
+tools can therefore use the text helpers, or run extractions in-process:
+
+    from question_extractor import to_english_digits, correct_common_spacing_errors
+    from question_extractor import extractor
+    summary = extractor.extract_pdf("soalat.pdf", 60, answer_key_page_number=8)
+
+The command-line entry points are extractor.main(), automator.main(), question_bank.main()
+and stub_site.main(), also available as `python -m question_extractor.extractor` etc.
+"""
+from .persian_text import PersianTextNormalizer, to_english_digits, correct_common_spacing_errors
+
+__all__ = ["PersianTextNormalizer", "to_english_digits", "correct_common_spacing_errors"]
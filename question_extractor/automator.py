@@ -0,0 +1,1292 @@
+import os
+import json
+import hashlib
+import argparse
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from .profiling import profiler
+from .question_bank import QUESTION_BANK_FILE, QuestionBank
+
+# Selenium تنها در حالت‌های مرورگر و با load_selenium() وارد می‌شود و requests تنها در حالت --http،
+# تا import این ماژول سریع و بدون وابستگی به آن‌ها باشد
+webdriver = By = WebDriverWait = EC = None
+
+
+def load_selenium():
+    """
+    وارد کردن Selenium در اولین استفاده و قرار دادن webdriver، By، WebDriverWait و EC در این ماژول
+    """
+    global webdriver, By, WebDriverWait, EC
+    if webdriver is not None:
+        return
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium import webdriver
+
+# --- تنظیمات ---
+LOGIN_URL = "https://biazmoon.com/"
+# ⚠️ اطلاعات کاربری واقعی خود را در اینجا و به صورت دستی وارد کنید
+YOUR_USERNAME = "your email"
+YOUR_PASSWORD = "your password"
+
+JSON_FILE = "example.json"
+QQQ_SESSION_NUMBER = "1403"
+TAGS_TO_ADD = ["آزمون کارشناسی ارشد ادیان و عرفان و تاریخ فرهنگ و تمدن اسلامی"]
+CREATE_QUESTION_URL = "https://biazmoon.com/User/Lessons/CreateQuestion/211"
+
+# --- تنظیمات ارسال مستقیم (HTTP) ---
+HTTP_WORKERS = 8  # تعداد درخواست‌های هم‌زمان در حالت --http
+HTTP_TIMEOUT_SECONDS = 30
+HTTP_MAX_ATTEMPTS = 3  # هر سوال حداکثر چند بار ارسال شود (فقط وقتی سرور قطعاً سوال را نساخته است)
+ANTIFORGERY_FIELD = "__RequestVerificationToken"
+USER_PANEL_MARKER = "درس ها"  # متنی که فقط پس از لاگین موفق در صفحه دیده می‌شود
+
+# --- تنظیمات حالت چند مرورگر (--browsers) ---
+BROWSER_WORKERS = 4  # تعداد مرورگرهای headless هم‌زمان
+UPLOAD_MAX_ATTEMPTS = 2  # هر سوال در هر مرورگر حداکثر چند بار وارد شود
+UPLOAD_REPORT_FILE = "upload_report.json"
+UPLOAD_PROFILE_FILE = "upload_profile.json"  # خروجی پیش‌فرض --profile
+FAST_FORM_FILL = True  # پر کردن همه فیلدهای فرم با یک execute_script به جای send_keys برای هر فیلد
+
+# --- تنظیمات ذخیره سوالات تایید شده ---
+# دکمه تایید (ConfirmQuestionBtn) سوال را فقط در فهرست سوالات تایید شده قرار می‌دهد؛ سوالات وقتی
+# در سایت ذخیره شده‌اند که دکمه ذخیره زده شود و پیام موفقیت سایت دیده شود
+SAVE_CONFIRMED_BUTTON_TEXT = "ذخیره سوالات تایید شده"
+SAVE_SUCCESS_TEXT = "با موفقیت"  # بخشی از پیامی که سایت پس از ذخیره موفق نشان می‌دهد
+SAVE_TIMEOUT_SECONDS = 60
+CONFIRM_TIMEOUT_SECONDS = 20  # مدت انتظار برای خالی شدن فرم پس از تایید، که نشان می‌دهد سایت سوال را پذیرفته
+MANUAL_SAVE_TIMEOUT_SECONDS = 100000  # در حالت تک‌مرورگر، مدت انتظار برای زدن دکمه ذخیره توسط کاربر
+SAVE_BUTTON_XPATH = (f"//*[self::button or self::a or self::input][contains(normalize-space(.), "
+                     f"'{SAVE_CONFIRMED_BUTTON_TEXT}') or contains(@value, '{SAVE_CONFIRMED_BUTTON_TEXT}')]")
+SAVE_SUCCESS_XPATH = f"//*[not(self::textarea) and not(self::script)][contains(text(), '{SAVE_SUCCESS_TEXT}')]"
+
+# --- تنظیمات کش شناسه تگ‌ها ---
+TAG_CACHE_FILE = ".tag_cache.json"
+TAG_CACHE_TTL_SECONDS = 7 * 24 * 3600  # پس از این مدت شناسه تگ دوباره از سایت گرفته می‌شود
+
+
+class TagCache:
+    """
+    کش شناسه تگ‌ها به ازای هر سایت: فیلدهایی که انتخاب یک تگ در صفحه به فرم اضافه می‌کند
+    (معمولاً یک input مخفی با شناسه تگ) یک بار با جستجوی تگ پیدا می‌شوند، به مدت
+    TAG_CACHE_TTL_SECONDS در TAG_CACHE_FILE می‌مانند و برای هر سوال مستقیماً به فرم اضافه می‌شوند.
+    """
+
+    def __init__(self, path=TAG_CACHE_FILE, ttl_seconds=TAG_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.enabled = True
+        self.refresh = False  # نادیده گرفتن شناسه‌هایی که پیش از این اجرا گرفته شده‌اند
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Could not read the tag cache '{path}': {e}. Starting with an empty cache.")
+
+    @staticmethod
+    def key(tag):
+        return f"{urlsplit(CREATE_QUESTION_URL).netloc}|{tag}"
+
+    def get(self, tag):
+        """فیلدهای [name, value] یک تگ، یا None اگر تگ در کش نباشد یا منقضی شده باشد"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(self.key(tag))
+        if entry is None or time.time() - entry["resolved_at"] > self.ttl_seconds or \
+                (self.refresh and entry["resolved_at"] < self.started_at):
+            return None
+        return entry["fields"]
+
+    def put(self, tag, fields):
+        with self.lock:
+            self.entries[self.key(tag)] = {"fields": fields, "resolved_at": time.time()}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+
+    def missing(self, tags):
+        return [tag for tag in tags if self.get(tag) is None]
+
+
+tag_cache = TagCache()
+
+# --- دفتر ثبت ارسال‌ها ---
+UPLOAD_LEDGER_FILE = "upload_ledger.jsonl"
+
+# --- تنظیمات حالت follow ---
+FOLLOW_POLL_SECONDS = 1.0  # فاصله بررسی فایل stream برای خطوط جدید
+FOLLOW_IDLE_TIMEOUT_SECONDS = 1800  # اگر فایل stream این مدت تغییر نکند، دنبال کردن متوقف می‌شود
+
+
+class UploadLedger:
+    """
+    دفتر ثبت سوالات ارسال‌شده (یک خط JSON برای هر سوال تاییدشده). هر سوال با هش محتوای آن
+    (متن، گزینه‌ها، گزینه صحیح، تگ‌ها، شماره جلسه و آدرس مقصد) شناخته می‌شود، تا اجرای
+    دوباره سوالات ثبت‌شده را تکرار نکند.
+    """
+
+    def __init__(self, path=UPLOAD_LEDGER_FILE):
+        self.path = path
+        self.resume = True  # رد شدن از سوالاتی که قبلاً ثبت شده‌اند
+        self.confirmed = set()
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self.confirmed.add(json.loads(line)["hash"])
+                except (ValueError, KeyError):
+                    continue  # خط ناقص (مثلاً قطع شدن برنامه هنگام نوشتن)
+        print(f"{len(self.confirmed)} confirmed upload(s) found in {self.path}.")
+
+    def contains(self, question_hash):
+        self.load()
+        return self.resume and question_hash in self.confirmed
+
+    def record(self, question_hash, question_number):
+        line = json.dumps({"hash": question_hash, "number": question_number, "url": CREATE_QUESTION_URL,
+                           "uploaded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, ensure_ascii=False)
+        with self.lock:
+            self.confirmed.add(question_hash)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+upload_ledger = UploadLedger()
+
+# لیست فیلدهای فرم ایجاد سوال به صورت [name, value]
+FORM_FIELDS_SCRIPT = """
+var form = document.getElementById('QuestionText').form;
+return Array.prototype.map.call(form.querySelectorAll('input[name]'), function (input) {
+    return [input.name, input.value];
+});
+"""
+
+# افزودن فیلدهای تگ‌های کش‌شده به فرم
+TAG_FIELDS_JS = """
+function applyTagFields(fields) {
+    var form = document.getElementById('QuestionText').form;
+    form.querySelectorAll('input.cached-tag-field').forEach(function (input) { input.remove(); });
+    fields.forEach(function (field) {
+        var input = document.createElement('input');
+        input.type = 'hidden';
+        input.className = 'cached-tag-field';
+        input.name = field[0];
+        input.value = field[1];
+        form.appendChild(input);
+    });
+}
+"""
+APPLY_TAG_FIELDS_SCRIPT = TAG_FIELDS_JS + "applyTagFields(arguments[0]);"
+
+# پر کردن همه فیلدهای فرم در یک فراخوانی؛ مقدار با setter اصلی تنظیم می‌شود و رویدادهای
+# input و change ارسال می‌شوند تا جاوااسکریپت صفحه مانند تایپ کاربر از تغییر باخبر شود
+FAST_FILL_SCRIPT = TAG_FIELDS_JS + """
+var payload = arguments[0];
+function setValue(element, value) {
+    var prototype = element.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+}
+function setChecked(element, checked) {
+    if (element.checked === checked) {
+        return;
+    }
+    element.checked = checked;
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+}
+var question = document.getElementById('QuestionText');
+var options = document.querySelectorAll('.Option .QuestionAnswer');
+var choices = document.querySelectorAll('.Option .ChoiceInput');
+var session = document.getElementById('SessionNumber');
+if (!question || options.length < payload.options.length || choices.length < payload.options.length || !session) {
+    return 'form fields not found';
+}
+setValue(question, payload.question);
+payload.options.forEach(function (text, i) { setValue(options[i], text); });
+Array.prototype.forEach.call(choices, function (choice, i) { setChecked(choice, i === payload.correctIndex); });
+setValue(session, payload.sessionNumber);
+if (payload.tagFields.length) {
+    applyTagFields(payload.tagFields);
+}
+return '';
+"""
+
+
+def login(driver, wait):
+    """
+    تابعی برای انجام خودکار فرآیند لاگین
+    """
+    try:
+        print("Attempting to log in...")
+        driver.get(LOGIN_URL)
+        username_field = wait.until(EC.presence_of_element_located((By.ID, 'UserName')))
+        password_field = driver.find_element(By.ID, 'Password')
+        username_field.send_keys(YOUR_USERNAME)
+        password_field.send_keys(YOUR_PASSWORD)
+        login_button = driver.find_element(By.CSS_SELECTOR, '.LF_Submit_Btn')
+        login_button.click()
+        print("Waiting for user panel to load...")
+        wait.until(EC.presence_of_element_located((By.LINK_TEXT, 'درس ها')))
+        print("✅ Login successful and user panel loaded.")
+        return True
+    except Exception as e:
+        print(f"!!! ERROR during login: {e}")
+        driver.save_screenshot("error_login.png")
+        print("Login failed. Screenshot saved to 'error_login.png'.")
+        return False
+
+
+def load_questions(json_file):
+    """
+    خواندن سوالات از فایل JSON و مرتب‌سازی بر اساس شماره سوال
+    """
+    with open(json_file, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    print(f"{len(questions)} questions loaded from {json_file}.")
+    questions.sort(key=lambda q: q.get('number', 0))
+    return questions
+
+
+def validate_question(q_data):
+    """
+    بررسی کامل بودن داده‌های یک سوال؛ در صورت نقص None برمی‌گرداند
+    """
+    question_number = q_data.get('number')
+    options = q_data.get('options')
+    correct_option_value = q_data.get('correct_option')
+    if not all([question_number, q_data.get('question', ""), options, correct_option_value]) or len(options) != 4:
+        print(f"**WARNING: Data for question number {question_number} is incomplete. Skipping.**")
+        return None
+    try:
+        correct_option_index = int(correct_option_value)
+    except ValueError:
+        print(f"**WARNING: correct_option برای سوال {question_number} عدد نیست. رد می‌شویم.**")
+        return None
+    if not 1 <= correct_option_index <= 4:
+        print(f"WARNING: Invalid correct_option index '{correct_option_index}' for question {question_number}. Skipping.")
+        return None
+    return correct_option_index
+
+
+def question_hash(q_data, correct_option_index):
+    """
+    هش محتوای یک سوال به همراه تنظیماتی که روی سوال ثبت‌شده اثر دارند
+    """
+    content = [q_data.get('question', ""), list(q_data.get('options')), correct_option_index, list(TAGS_TO_ADD),
+               QQQ_SESSION_NUMBER, CREATE_QUESTION_URL]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def iter_uploads(questions, counts):
+    """
+    اعتبارسنجی سوالات و کنار گذاشتن سوالاتی که در دفتر ثبت تایید شده‌اند. برای هر سوال
+    قابل ارسال (q_data, correct_option_index, hash) برمی‌گرداند و تعداد سوالات رد شده و
+    نامعتبر را در counts["skipped"] و counts["invalid"] می‌شمارد.
+    """
+    for q_data in questions:
+        correct_option_index = validate_question(q_data)
+        if correct_option_index is None:
+            counts["invalid"] += 1
+            continue
+        content_hash = question_hash(q_data, correct_option_index)
+        if upload_ledger.contains(content_hash):
+            counts["skipped"] += 1
+            continue
+        yield q_data, correct_option_index, content_hash
+
+
+def prepare_uploads(questions):
+    """
+    مانند iter_uploads برای یک لیست کامل از سوالات؛ خروجی: (لیست سوالات قابل ارسال، counts)
+    """
+    counts = {"skipped": 0, "invalid": 0}
+    pending = list(iter_uploads(questions, counts))
+    if counts["skipped"]:
+        print(f"{counts['skipped']} question(s) were already uploaded in a previous run and will be skipped.")
+    return pending, counts
+
+
+# فیلترهای خواندن سوالات از بانک سوال (--bank)؛ None یعنی خواندن از فایل JSON
+bank_query = None
+
+
+def load_questions_from_bank(path=QUESTION_BANK_FILE, source=None, search=None, include_duplicates=False,
+                             limit=None):
+    """
+    خواندن سوالات دارای گزینه صحیح از بانک سوال SQLite. سوالاتی که تکراری یک سوال دیگر
+    بانک شناخته شده‌اند، جز با include_duplicates کنار گذاشته می‌شوند.
+    """
+    bank = QuestionBank(path)
+    try:
+        questions = list(bank.iter_questions(source=source, search=search, include_duplicates=include_duplicates,
+                                             answered_only=True, limit=limit))
+        skipped_duplicates = 0 if include_duplicates else bank.count_duplicates(source=source, search=search,
+                                                                                answered_only=True)
+    finally:
+        bank.close()
+    print(f"{len(questions)} questions loaded from the question bank {path}.")
+    if skipped_duplicates:
+        print(f"{skipped_duplicates} question(s) marked as near-duplicates were skipped "
+              f"(use --include-duplicates to upload them too).")
+    return questions
+
+
+def question_source(json_file, follow=False):
+    """
+    منبع سوالات: فایل JSON کامل، بانک سوال (--bank)، یا در حالت follow فایل JSONL در حال
+    نوشتن توسط extractor.py --stream
+    """
+    if bank_query is not None:
+        return load_questions_from_bank(**bank_query)
+    return follow_question_stream(json_file) if follow else load_questions(json_file)
+
+
+def follow_question_stream(stream_file):
+    """
+    خواندن پیوسته فایل JSONL که extractor.py --stream در حال نوشتن آن است. سوالاتی که
+    گزینه صحیح دارند بلافاصله برگردانده می‌شوند؛ بقیه تا رسیدن رکورد answer_key نگه داشته
+    می‌شوند. با رسیدن رکورد end (یا نوشته نشدن چیزی به مدت FOLLOW_IDLE_TIMEOUT_SECONDS) پایان می‌یابد.
+    """
+    print(f"Following question stream {stream_file}...")
+    idle_since = time.time()
+    while not os.path.exists(stream_file):
+        if time.time() - idle_since > FOLLOW_IDLE_TIMEOUT_SECONDS:
+            print(f"WARNING: {stream_file} was not created. Stopping.")
+            return
+        time.sleep(FOLLOW_POLL_SECONDS)
+
+    answer_key = {}
+    held = {}  # شماره سوال -> سوالی که منتظر کلید پاسخ است
+    with open(stream_file, "r", encoding="utf-8") as f:
+        partial_line = ""
+        while True:
+            line = f.readline()
+            if not line.endswith("\n"):
+                # خط هنوز کامل نوشته نشده (یا فایل تمام شده)؛ کمی صبر می‌کنیم
+                partial_line += line
+                if time.time() - idle_since > FOLLOW_IDLE_TIMEOUT_SECONDS:
+                    print(f"WARNING: No new data in {stream_file} for {FOLLOW_IDLE_TIMEOUT_SECONDS}s. Stopping.")
+                    break
+                time.sleep(FOLLOW_POLL_SECONDS)
+                continue
+            line, partial_line = partial_line + line, ""
+            idle_since = time.time()
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"WARNING: Skipping an unreadable line in {stream_file}.")
+                continue
+
+            if record.get("type") == "question":
+                q_data = record["question"]
+                question_number = q_data.get('number')
+                if q_data.get('correct_option') is None and question_number in answer_key:
+                    q_data['correct_option'] = answer_key[question_number]
+                if q_data.get('correct_option') is not None:
+                    yield q_data
+                else:
+                    held[question_number] = q_data
+            elif record.get("type") == "answer_key":
+                answer_key.update({int(number): option for number, option in record["answers"].items()})
+                for question_number in sorted(number for number in held if number in answer_key):
+                    q_data = held.pop(question_number)
+                    q_data['correct_option'] = answer_key[question_number]
+                    yield q_data
+            elif record.get("type") == "end":
+                if record.get("error"):
+                    print(f"WARNING: The extractor stopped with an error: {record['error']}")
+                print(f"Question stream finished ({record.get('questions')} questions extracted).")
+                break
+
+    if held:
+        print(f"WARNING: {len(held)} question(s) never received a correct option: "
+              f"{', '.join(str(number) for number in sorted(held))}")
+        yield from (held[number] for number in sorted(held))
+
+
+def print_upload_summary(uploaded, counts, failed, seconds=None):
+    timing = f" in {seconds:.1f}s" if seconds is not None else ""
+    print(f"\nUpload summary{timing}: {uploaded} uploaded, {counts['skipped']} skipped (already uploaded), "
+          f"{failed} failed, {counts['invalid']} invalid.")
+    if failed:
+        print("Run the script again to retry only the failed questions.")
+
+
+def search_and_select_tag(driver, wait, tag_to_add):
+    """
+    جستجوی یک تگ در صفحه و انتخاب اولین نتیجه؛ در صورت موفقیت True برمی‌گرداند
+    """
+    try:
+        tag_input_field = wait.until(EC.presence_of_element_located((By.ID, "search-tag-input")))
+        tag_input_field.clear()
+        tag_input_field.send_keys(tag_to_add)
+
+        search_tag_button = wait.until(EC.element_to_be_clickable((By.ID, "search-tag-button")))
+        search_tag_button.click()
+
+        unique_tag_result_xpath = f"//div[@id='search-tag-list-container']/div/button[contains(@class, 'tag-selector-item')]"
+        tag_element_to_click = wait.until(
+            EC.element_to_be_clickable((By.XPATH, unique_tag_result_xpath)))
+
+        driver.execute_script("arguments[0].click();", tag_element_to_click)
+        print(f"  - Tag '{tag_to_add}' added successfully.")
+        return True
+    except Exception as tag_e:
+        print(f"  - !!! WARNING: Failed to add tag '{tag_to_add}'. Reason: {tag_e}")
+        return False
+
+
+def resolve_tags(driver, wait, tags):
+    """
+    گرفتن شناسه تگ‌هایی که در کش نیستند: هر تگ یک بار در صفحه جستجو و انتخاب می‌شود و
+    فیلدهایی که انتخاب آن به فرم اضافه می‌کند در کش ذخیره می‌شوند
+    """
+    if not tag_cache.enabled:
+        return
+    missing_tags = tag_cache.missing(tags)
+    if not missing_tags:
+        print(f"All {len(tags)} tag(s) found in the tag cache.")
+        return
+    print(f"Resolving {len(missing_tags)} tag(s) through the tag search...")
+    for tag in missing_tags:
+        driver.get(CREATE_QUESTION_URL)
+        wait.until(EC.presence_of_element_located((By.ID, "QuestionText")))
+        fields_before = driver.execute_script(FORM_FIELDS_SCRIPT)
+        if not search_and_select_tag(driver, wait, tag):
+            continue
+        remaining = list(fields_before)
+        new_fields = []
+        for field in driver.execute_script(FORM_FIELDS_SCRIPT):
+            if field in remaining:
+                remaining.remove(field)
+            else:
+                new_fields.append(field)
+        if not new_fields:
+            print(f"  - WARNING: Selecting tag '{tag}' added no form field; it will be searched for every question.")
+            continue
+        tag_cache.put(tag, new_fields)
+        print(f"  - Tag '{tag}' cached as {new_fields}.")
+    driver.get(CREATE_QUESTION_URL)
+
+
+def fast_fill_question(driver, q_data, correct_option_index, tag_fields):
+    """
+    پر کردن همه فیلدهای سوال با یک execute_script؛ در صورت شکست False برمی‌گرداند
+    """
+    payload = {"question": q_data.get('question', ""), "options": q_data.get('options')[:4],
+               "correctIndex": correct_option_index - 1, "sessionNumber": QQQ_SESSION_NUMBER,
+               "tagFields": tag_fields}
+    try:
+        error = driver.execute_script(FAST_FILL_SCRIPT, payload)
+    except Exception as e:
+        error = str(e).splitlines()[0] if str(e) else type(e).__name__
+    if error:
+        print(f"WARNING: Fast form fill failed ({error}). Falling back to filling the fields one by one.")
+        return False
+    print(f"Question text, options, correct option {correct_option_index} and session number set in one step.")
+    return True
+
+
+def fill_question_fields(driver, wait, q_data, correct_option_index, tag_fields):
+    """
+    پر کردن فیلدها یکی‌یکی با send_keys (روش قبلی، برای وقتی که پر کردن سریع ممکن نیست)
+    """
+    question_textarea = wait.until(EC.presence_of_element_located((By.ID, "QuestionText")))
+    question_textarea.clear()
+    question_textarea.send_keys(q_data.get('question', ""))
+    print("Question text entered.")
+
+    options = q_data.get('options')
+    option_text_fields = wait.until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".Option .QuestionAnswer")))
+    correct_option_checkboxes = wait.until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".Option .ChoiceInput")))
+
+    # ابتدا تمام چک‌باکس‌های قبلی را غیرفعال می‌کنیم
+    for cb in correct_option_checkboxes:
+        if cb.is_selected():
+            driver.execute_script("arguments[0].click();", cb)
+
+    # متن هر چهار گزینه را وارد می‌کنیم
+    for i in range(4):
+        option_text_fields[i].clear()
+        option_text_fields[i].send_keys(options[i])
+    print("Options entered.")
+
+    # گزینه صحیح را تیک می‌زنیم
+    correct_checkbox_to_select = correct_option_checkboxes[correct_option_index - 1]
+    driver.execute_script("arguments[0].checked = true;", correct_checkbox_to_select)
+    print(f"Option {correct_option_index} selected as correct answer.")
+
+    if tag_fields:
+        driver.execute_script(APPLY_TAG_FIELDS_SCRIPT, tag_fields)
+
+    session_number_field = wait.until(EC.presence_of_element_located((By.ID, "SessionNumber")))
+    session_number_field.clear()
+    session_number_field.send_keys(QQQ_SESSION_NUMBER)
+    print(f"Session number '{QQQ_SESSION_NUMBER}' entered.")
+
+
+def fill_and_confirm_question(driver, wait, q_data, correct_option_index):
+    """
+    پر کردن فرم ایجاد سوال برای یک سوال، زدن دکمه تایید و انتظار برای پذیرفته شدن آن؛ اگر
+    فرم پس از تایید خالی نشود (سایت سوال را نپذیرفته است) خطا می‌دهد
+    """
+    # تگ‌های کش‌شده همراه بقیه فیلدها تنظیم می‌شوند، بقیه با جستجو در صفحه
+    tag_fields = []
+    uncached_tags = []
+    for tag_to_add in TAGS_TO_ADD:
+        fields = tag_cache.get(tag_to_add)
+        if fields is not None:
+            tag_fields.extend(fields)
+        else:
+            uncached_tags.append(tag_to_add)
+
+    question_number = q_data.get('number')
+    with profiler.span("question", number=question_number, chars=len(q_data.get('question', ""))):
+        with profiler.span("wait_form", number=question_number):
+            wait.until(EC.presence_of_element_located((By.ID, "QuestionText")))
+        with profiler.span("fast_fill", number=question_number) as span:
+            span["ok"] = FAST_FORM_FILL and fast_fill_question(driver, q_data, correct_option_index, tag_fields)
+        if not span["ok"]:
+            with profiler.span("slow_fill", number=question_number):
+                fill_question_fields(driver, wait, q_data, correct_option_index, tag_fields)
+        if tag_fields:
+            print(f"{len(TAGS_TO_ADD) - len(uncached_tags)} cached tag(s) applied.")
+        for tag_to_add in uncached_tags:
+            with profiler.span("tag_search", number=question_number):
+                search_and_select_tag(driver, wait, tag_to_add)
+
+        with profiler.span("confirm", number=question_number):
+            confirm_button = wait.until(EC.element_to_be_clickable((By.ID, "ConfirmQuestionBtn")))
+            confirm_button.click()
+            WebDriverWait(driver, CONFIRM_TIMEOUT_SECONDS).until(
+                form_was_reset, "the form was not reset after confirming, so the site did not accept the question")
+
+
+def form_was_reset(driver):
+    """آیا فرم ایجاد سوال پس از تایید دوباره خالی شده است"""
+    try:
+        return driver.find_element(By.ID, "QuestionText").get_attribute("value") == ""
+    except Exception:
+        return False  # صفحه در حال بارگذاری دوباره است
+
+
+def wait_for_manual_save(driver, confirmed, timeout=MANUAL_SAVE_TIMEOUT_SECONDS):
+    """
+    انتظار برای زدن دکمه ذخیره توسط کاربر و دیدن پیام موفقیت سایت؛ سوالات تایید شده (confirmed،
+    لیست (hash, number)) فقط پس از آن در دفتر ثبت می‌شوند. تعداد سوالات ذخیره‌شده را برمی‌گرداند.
+    """
+    print(f"\nWaiting for '{SAVE_CONFIRMED_BUTTON_TEXT}' to be pressed to save {len(confirmed)} confirmed "
+          f"question(s)...")
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, SAVE_SUCCESS_XPATH)))
+    except Exception:
+        print(f"WARNING: The site did not confirm a save. The {len(confirmed)} confirmed question(s) were not "
+              f"recorded as uploaded and will be entered again on the next run.")
+        return 0
+    for content_hash, question_number in confirmed:
+        upload_ledger.record(content_hash, question_number)
+    print(f"✅ {len(confirmed)} confirmed question(s) saved and recorded.")
+    return len(confirmed)
+
+
+def automate_question_entry(json_file=JSON_FILE, follow=False):
+    """
+    تابع اصلی برای ورود خودکار سوالات پس از لاگین
+    """
+    load_selenium()
+    driver = webdriver.Chrome()
+    driver.maximize_window()
+    wait = WebDriverWait(driver, 20)
+    counts = {"skipped": 0, "invalid": 0}
+    confirmed = []  # (hash, number) سوالات تایید شده؛ پس از ذخیره توسط کاربر در دفتر ثبت می‌شوند
+    failed = 0
+    try:
+        # مرحله ۱: لاگین خودکار
+        with profiler.span("login"):
+            logged_in = login(driver, wait)
+        if not logged_in:
+            return
+
+        # مرحله ۲: رفتن به صفحه ایجاد سوال
+        with profiler.span("resolve_tags"):
+            resolve_tags(driver, wait, TAGS_TO_ADD)
+        print(f"Navigating to create question page: {CREATE_QUESTION_URL}")
+        driver.get(CREATE_QUESTION_URL)
+
+        # مرحله ۳: خواندن سوالات از فایل
+        # اعتبارسنجی اولیه داده‌های سوال و رد شدن از سوالات ثبت‌شده
+        if follow:
+            pending = iter_uploads(question_source(json_file, follow), counts)
+        else:
+            pending, counts = prepare_uploads(question_source(json_file))
+        total = len(pending) if not follow else "?"
+
+        # مرحله ۴: شروع حلقه ورود سوالات
+        for q_index, (q_data, correct_option_index, content_hash) in enumerate(pending):
+            question_number = q_data.get('number')
+            print(f"\n--- Starting to enter question number {question_number} ({q_index + 1}/{total}) ---")
+            try:
+                fill_and_confirm_question(driver, wait, q_data, correct_option_index)
+                confirmed.append((content_hash, question_number))
+                print(f"✅ Question {question_number} confirmed.")
+
+            except Exception as e:
+                failed += 1
+                print(f"!!! ERROR processing question number {question_number}: {e}")
+                driver.save_screenshot(f"error_q_{question_number}.png")
+                print(f"Screenshot saved. Continuing with the next question...")
+                driver.get(CREATE_QUESTION_URL)
+                continue
+
+        print(f"\n✅ Question entry process completed: {len(confirmed)} question(s) confirmed.")
+    except Exception as main_e:
+        print(f"\n!!! GENERAL ERROR in the program: {main_e}")
+    finally:
+        print("\n✅ Program finished. The browser will remain open for you to inspect.")
+        profiler.report()
+
+        question_textarea = wait.until(EC.presence_of_element_located((By.ID, "QuestionText")))
+        question_textarea.clear()
+        question_textarea.send_keys("***************شما یک دقیقه وقت دارید تا سوالات را برسی کرده و گزینه ذخیره سوالات تایید شده را بزنید، در غیر این صورت بدون ذخیره شدن مرورگر بسته خواهد شد.**********************")
+        if confirmed:
+            # سوالات فقط پس از ذخیره توسط کاربر و پیام موفقیت سایت در دفتر ثبت می‌شوند
+            saved = wait_for_manual_save(driver, confirmed)
+            print_upload_summary(saved, counts, failed + len(confirmed) - saved)
+        else:
+            print_upload_summary(0, counts, failed)
+            time.sleep(MANUAL_SAVE_TIMEOUT_SECONDS)
+        driver.quit()
+
+
+def save_confirmed_questions(driver):
+    """
+    زدن دکمه «ذخیره سوالات تایید شده» و انتظار برای پیام موفقیت سایت؛ در صورت شکست خطا می‌دهد
+    """
+    with profiler.span("save_confirmed"):
+        save_button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, SAVE_BUTTON_XPATH)))
+        save_button.click()
+        WebDriverWait(driver, SAVE_TIMEOUT_SECONDS).until(
+            EC.presence_of_element_located((By.XPATH, SAVE_SUCCESS_XPATH)))
+
+
+# --- ورود موازی با چند مرورگر headless ---
+def make_driver(headless=True):
+    """
+    ساخت یک مرورگر Chrome (به صورت پیش‌فرض headless)
+    """
+    load_selenium()
+    chrome_options = webdriver.ChromeOptions()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+    driver = webdriver.Chrome(options=chrome_options)
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def login_with_cookies(driver, wait, cookies):
+    """
+    ورود با کوکی‌های یک مرورگر دیگر؛ اگر نشست معتبر نباشد لاگین عادی انجام می‌شود
+    """
+    if cookies:
+        driver.get(LOGIN_URL)  # کوکی‌ها فقط روی همان دامنه قابل تنظیم هستند
+        for cookie in cookies:
+            cookie = {key: value for key, value in cookie.items() if key in ("name", "value", "path", "secure",
+                                                                            "httpOnly", "expiry", "sameSite")}
+            driver.add_cookie(cookie)
+        driver.get(CREATE_QUESTION_URL)
+        try:
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "QuestionText")))
+            return True
+        except Exception:
+            print("WARNING: Shared cookies were not accepted. Logging in again...")
+    return login(driver, wait)
+
+
+def upload_shard(worker_id, shard, cookies, headless, results):
+    """
+    ورود سوالات یک بخش (shard) با یک مرورگر مستقل؛ نتیجه هر سوال به ترتیب shard به results
+    اضافه می‌شود تا اگر مرورگر از کار بیفتد، نتیجه سوالات انجام‌شده از دست نرود. سوالات تایید
+    شده در پایان با دکمه ذخیره ذخیره می‌شوند و فقط پس از پیام موفقیت سایت ثبت‌شده به حساب می‌آیند.
+    """
+    confirmed = []  # (result, content_hash) سوالاتی که تایید شده‌اند ولی هنوز ذخیره نشده‌اند
+    driver = make_driver(headless)
+    wait = WebDriverWait(driver, 20)
+    try:
+        with profiler.span("login", worker=worker_id):
+            logged_in = login_with_cookies(driver, wait, cookies)
+        if not logged_in:
+            driver.save_screenshot(f"error_login_w{worker_id}.png")
+            results.extend({"number": q_data.get('number'), "worker": worker_id, "status": "failed", "attempts": 0,
+                            "error": "login failed"} for q_data, _, _ in shard)
+            return results
+        driver.get(CREATE_QUESTION_URL)
+        for q_data, correct_option_index, content_hash in shard:
+            question_number = q_data.get('number')
+            result = {"number": question_number, "worker": worker_id, "status": "failed", "attempts": 0,
+                      "error": None}
+            for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+                result["attempts"] = attempt
+                try:
+                    fill_and_confirm_question(driver, wait, q_data, correct_option_index)
+                    result["status"] = "confirmed"
+                    result["error"] = "confirmed but not saved"
+                    confirmed.append((result, content_hash))
+                    print(f"[worker {worker_id}] Question {question_number} confirmed.")
+                    break
+                except Exception as e:
+                    result["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                    screenshot = f"error_w{worker_id}_q{question_number}_a{attempt}.png"
+                    driver.save_screenshot(screenshot)
+                    print(f"[worker {worker_id}] !!! ERROR on question {question_number} "
+                          f"(attempt {attempt}/{UPLOAD_MAX_ATTEMPTS}): {result['error']}. Screenshot: {screenshot}")
+                    driver.get(CREATE_QUESTION_URL)
+            results.append(result)
+        if confirmed:
+            try:
+                save_confirmed_questions(driver)
+            except Exception as e:
+                error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                driver.save_screenshot(f"error_save_w{worker_id}.png")
+                print(f"[worker {worker_id}] !!! ERROR saving {len(confirmed)} confirmed question(s): {error}")
+                for result, _ in confirmed:
+                    result["status"] = "failed"
+                    result["error"] = f"confirmed but not saved: {error}"
+                return results
+            for result, content_hash in confirmed:
+                upload_ledger.record(content_hash, result["number"])
+                result["status"] = "uploaded"
+                result["error"] = None
+            print(f"[worker {worker_id}] ✅ {len(confirmed)} confirmed question(s) saved.")
+    finally:
+        driver.quit()
+    return results
+
+
+def upload_questions_parallel(json_file=JSON_FILE, workers=BROWSER_WORKERS, headless=True,
+                              report_filename=UPLOAD_REPORT_FILE):
+    """
+    تقسیم سوالات مرتب‌شده بین چند مرورگر هم‌زمان و ادغام نتایج در یک گزارش
+    """
+    load_selenium()
+    valid_questions, counts = prepare_uploads(question_source(json_file))
+    workers = max(1, min(workers, len(valid_questions)))
+    if not valid_questions:
+        print("No questions left to upload.")
+        print_upload_summary(0, counts, 0)
+        return
+
+    # یک لاگین؛ کوکی‌های آن بین همه مرورگرها مشترک است
+    print("Logging in once to share the session with all workers...")
+    driver = make_driver(headless)
+    try:
+        wait = WebDriverWait(driver, 20)
+        with profiler.span("login"):
+            cookies = driver.get_cookies() if login(driver, wait) else None
+        if cookies is not None:
+            with profiler.span("resolve_tags"):
+                resolve_tags(driver, wait, TAGS_TO_ADD)
+            driver.get(CREATE_QUESTION_URL)
+            wait.until(EC.presence_of_element_located((By.ID, "QuestionText")))
+            can_save = bool(driver.find_elements(By.XPATH, SAVE_BUTTON_XPATH))
+    finally:
+        driver.quit()
+    if cookies is None:
+        print("Login failed. Exiting.")
+        return
+    if not can_save:
+        # بدون دکمه ذخیره، سوالات تایید شده در مرورگرهای headless بدون ذخیره از بین می‌روند
+        print(f"ERROR: No '{SAVE_CONFIRMED_BUTTON_TEXT}' button was found on the create question page, so the "
+              f"worker browsers could not save the questions they confirm. Use the single browser mode instead.")
+        return
+
+    # بخش‌های پیوسته تا ترتیب سوالات در هر مرورگر حفظ شود
+    shard_size = -(-len(valid_questions) // workers)
+    shards = [valid_questions[i:i + shard_size] for i in range(0, len(valid_questions), shard_size)]
+    print(f"Uploading {len(valid_questions)} questions with {len(shards)} browser worker(s)...")
+    started_at = time.time()
+    results = []
+    shard_results = [[] for _ in shards]
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        futures = {executor.submit(upload_shard, worker_id, shard, cookies, headless, shard_results[worker_id - 1]):
+                   worker_id for worker_id, shard in enumerate(shards, start=1)}
+        for future in as_completed(futures):
+            worker_id = futures[future]
+            finished = shard_results[worker_id - 1]
+            try:
+                future.result()
+            except Exception as e:
+                # خطای یک مرورگر نباید نتیجه بخش‌های دیگر و گزارش را از بین ببرد
+                error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                print(f"!!! ERROR: Browser worker {worker_id} stopped: {error}")
+                finished.extend({"number": q_data.get('number'), "worker": worker_id, "status": "failed",
+                                 "attempts": 0, "error": f"worker stopped: {error}"}
+                                for q_data, _, _ in shards[worker_id - 1][len(finished):])
+            results.extend(finished)
+
+    results.sort(key=lambda result: result["number"])
+    seconds = time.time() - started_at
+    uploaded = [result for result in results if result["status"] == "uploaded"]
+    failed = [result for result in results if result["status"] != "uploaded"]
+    print(f"\n✅ {len(uploaded)}/{len(results)} question(s) uploaded by {len(shards)} worker(s) in {seconds:.1f}s.")
+    if failed:
+        print(f"WARNING: {len(failed)} question(s) failed: "
+              f"{', '.join(str(result['number']) + ' (' + str(result['error']) + ')' for result in failed)}")
+    print_upload_summary(len(uploaded), counts, len(failed), seconds)
+    if report_filename:
+        with open(report_filename, "w", encoding="utf-8") as f:
+            json.dump({"seconds": round(seconds, 1), "workers": len(shards), "uploaded": len(uploaded),
+                       "skipped": counts["skipped"], "failed": len(failed), "invalid": counts["invalid"],
+                       "questions": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Upload report written to {report_filename}.")
+
+
+# --- ارسال مستقیم فرم‌ها از طریق HTTP ---
+class FormParser(HTMLParser):
+    """
+    استخراج فرم‌های یک صفحه و فیلدهای آن‌ها (input، textarea و select) به ترتیب صفحه،
+    تا بتوان فرم را بدون مرورگر ارسال کرد
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.current_form = None
+        self.current_field = None  # textarea or select whose content is being read
+        self.current_button = False  # متن دکمه به آخرین عضو buttons فرم اضافه می‌شود
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value if value is not None else "" for name, value in attrs}
+        if tag == "form":
+            self.current_form = {"action": attrs.get("action", ""), "method": attrs.get("method", "get").lower(),
+                                 "fields": [], "buttons": []}
+            self.forms.append(self.current_form)
+            return
+        if self.current_form is None:
+            return
+        if tag == "button" or (tag == "input" and attrs.get("type", "").lower() == "submit"):
+            self.current_form["buttons"].append(attrs.get("value", ""))
+            if tag == "button":
+                self.current_button = True
+                return
+        if tag in ("input", "textarea", "select"):
+            field = {"tag": tag, "name": attrs.get("name", ""), "id": attrs.get("id", ""),
+                     "type": attrs.get("type", "text").lower() if tag == "input" else tag,
+                     "classes": attrs.get("class", "").split(), "value": attrs.get("value", ""),
+                     "checked": "checked" in attrs}
+            self.current_form["fields"].append(field)
+            if tag == "textarea":
+                self.current_field = field
+            elif tag == "select":
+                field["value"] = None
+                self.current_field = field
+        elif tag == "option" and self.current_field is not None and self.current_field["tag"] == "select":
+            if self.current_field["value"] is None or "selected" in attrs:
+                self.current_field["value"] = attrs.get("value", "")
+
+    def handle_data(self, data):
+        if self.current_button and self.current_form is not None:
+            self.current_form["buttons"][-1] += data
+        elif self.current_field is not None and self.current_field["tag"] == "textarea":
+            self.current_field["value"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self.current_form = None
+        elif tag == "button":
+            self.current_button = False
+        elif tag in ("textarea", "select"):
+            self.current_field = None
+
+
+def find_form(html, field_id):
+    """
+    فرمی از صفحه که فیلدی با شناسه field_id دارد (یا None)
+    """
+    parser = FormParser()
+    parser.feed(html)
+    for form in parser.forms:
+        if any(field["id"] == field_id for field in form["fields"]):
+            return form
+    return None
+
+
+def find_form_with_button(html, button_text):
+    """
+    فرمی از صفحه که دکمه‌ای با متن button_text دارد (یا None)
+    """
+    parser = FormParser()
+    parser.feed(html)
+    for form in parser.forms:
+        if any(button_text in " ".join(button.split()) for button in form["buttons"]):
+            return form
+    return None
+
+
+def form_defaults(form, skip_fields=()):
+    """
+    مقادیر پیش‌فرض فرم، همان‌طور که مرورگر ارسال می‌کند (شامل توکن anti-forgery)
+    """
+    data = []
+    for field in form["fields"]:
+        if not field["name"] or field["type"] in ("submit", "button", "reset", "file", "image") or \
+                id(field) in skip_fields:
+            continue
+        if field["type"] in ("checkbox", "radio") and not field["checked"]:
+            continue
+        data.append((field["name"], field["value"] or ("on" if field["type"] == "checkbox" else "")))
+    return data
+
+
+def http_login(session, login_url):
+    """
+    لاگین مستقیم با ارسال فرم ورود، بدون مرورگر
+    """
+    print("Attempting to log in over HTTP...")
+    response = session.get(login_url, timeout=HTTP_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    form = find_form(response.text, "UserName")
+    if form is None:
+        print("!!! ERROR during login: No login form with a 'UserName' field found.")
+        return False
+    fields_by_id = {field["id"]: field for field in form["fields"] if field["id"]}
+    data = [(name, value) for name, value in form_defaults(form)
+            if name not in (fields_by_id["UserName"]["name"], fields_by_id.get("Password", {}).get("name"))]
+    data.append((fields_by_id["UserName"]["name"], YOUR_USERNAME))
+    data.append((fields_by_id.get("Password", {}).get("name", "Password"), YOUR_PASSWORD))
+    response = session.post(urljoin(response.url, form["action"] or response.url), data=data,
+                            timeout=HTTP_TIMEOUT_SECONDS)
+    if response.status_code >= 400 or USER_PANEL_MARKER not in response.text:
+        print(f"!!! ERROR during login: The user panel did not load (HTTP {response.status_code}).")
+        return False
+    print("✅ Login successful.")
+    return True
+
+
+def selenium_login_cookies(session):
+    """
+    لاگین با مرورگر (مانند حالت عادی) و انتقال کوکی‌های آن به نشست HTTP
+    """
+    load_selenium()
+    driver = webdriver.Chrome()
+    try:
+        if not login(driver, WebDriverWait(driver, 20)):
+            return False
+        resolve_tags(driver, WebDriverWait(driver, 20), TAGS_TO_ADD)
+        for cookie in driver.get_cookies():
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                                path=cookie.get("path", "/"))
+        print(f"{len(driver.get_cookies())} cookies copied from the browser session.")
+        return True
+    finally:
+        driver.quit()
+
+
+class QuestionFormSubmitter:
+    """
+    ارسال مستقیم فرم ایجاد سوال با یک نشست HTTP مشترک. فرم یک بار خوانده می‌شود تا آدرس
+    ارسال، نام فیلدها و توکن anti-forgery مشخص شود؛ توکن برای همه سوالات استفاده می‌شود و
+    فقط وقتی سرور آن را رد کند دوباره خوانده می‌شود. اگر صفحه فرم «ذخیره سوالات تایید شده»
+    داشته باشد، سوالات ارسال‌شده فقط تایید شده‌اند و save_confirmed() آن‌ها را ذخیره می‌کند.
+    """
+
+    def __init__(self, session, create_question_url):
+        self.session = session
+        self.create_question_url = create_question_url
+        self.form = None
+        self.form_url = None
+        self.form_version = 0
+        self.save_form = None
+        self.save_url = None
+        self.lock = threading.Lock()
+
+    def refresh_form(self, seen_version=None):
+        """خواندن دوباره فرم، مگر این‌که رشته دیگری پس از seen_version این کار را کرده باشد"""
+        with self.lock:
+            if seen_version is not None and seen_version != self.form_version:
+                return
+            with profiler.span("http_form_fetch"):
+                response = self.session.get(self.create_question_url, timeout=HTTP_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            form = find_form(response.text, "QuestionText")
+            if form is None:
+                raise RuntimeError("No form with a 'QuestionText' field on the create question page "
+                                   "(is the session logged in?).")
+            if not any(field["name"] == ANTIFORGERY_FIELD for field in form["fields"]):
+                print(f"WARNING: The create question form has no '{ANTIFORGERY_FIELD}' field.")
+            self.form = form
+            self.form_url = urljoin(response.url, form["action"] or response.url)
+            self.save_form = find_form_with_button(response.text, SAVE_CONFIRMED_BUTTON_TEXT)
+            if self.save_form is not None:
+                self.save_url = urljoin(response.url, self.save_form["action"] or response.url)
+            self.form_version += 1
+
+    def save_confirmed(self):
+        """ارسال فرم ذخیره سوالات تایید شده؛ اگر پیام موفقیت سایت دیده نشود RuntimeError می‌دهد"""
+        with profiler.span("http_save"):
+            response = self.session.post(self.save_url, data=form_defaults(self.save_form),
+                                         timeout=HTTP_TIMEOUT_SECONDS)
+        if response.status_code >= 400 or SAVE_SUCCESS_TEXT not in response.text:
+            raise RuntimeError(f"the site did not confirm the save (HTTP {response.status_code})")
+
+    def build_form_data(self, q_data, correct_option_index):
+        fields = self.form["fields"]
+        question_field = next(field for field in fields if field["id"] == "QuestionText")
+        option_fields = [field for field in fields if "QuestionAnswer" in field["classes"]]
+        choice_fields = [field for field in fields if "ChoiceInput" in field["classes"]]
+        session_field = next((field for field in fields if field["id"] == "SessionNumber"), None)
+        if len(option_fields) < 4 or len(choice_fields) < 4:
+            raise RuntimeError("The create question form does not have four option fields.")
+
+        replaced = [question_field] + option_fields[:4] + choice_fields + ([session_field] if session_field else [])
+        data = form_defaults(self.form, skip_fields={id(field) for field in replaced})
+        data.append((question_field["name"], q_data["question"]))
+        for field, option_text in zip(option_fields, q_data["options"]):
+            data.append((field["name"], option_text))
+        correct_field = choice_fields[correct_option_index - 1]
+        data.append((correct_field["name"], correct_field["value"] or "on"))
+        if session_field is not None:
+            data.append((session_field["name"], QQQ_SESSION_NUMBER))
+        for tag_to_add in TAGS_TO_ADD:
+            data.extend((name, value) for name, value in tag_cache.get(tag_to_add) or [])
+        token = next((value for name, value in data if name == ANTIFORGERY_FIELD), None)
+        return data, token
+
+    def submit(self, q_data, correct_option_index):
+        """
+        ارسال یک سوال؛ اگر همه تلاش‌ها ناموفق باشند RuntimeError می‌دهد. ارسال فرم idempotent
+        نیست، پس فقط وقتی دوباره تلاش می‌شود که سوال قطعاً ساخته نشده است: اتصال برقرار نشده،
+        یا سرور با 503/429 یا رد توکن (400/403/419) پاسخ داده است. پس از timeout خواندن پاسخ
+        یا سایر خطاهای 5xx ممکن است سوال ساخته شده باشد، پس ارسال تکرار نمی‌شود.
+        """
+        import requests
+
+        last_error = None
+        for attempt in range(1, HTTP_MAX_ATTEMPTS + 1):
+            form_version = self.form_version
+            data, token = self.build_form_data(q_data, correct_option_index)
+            headers = {"RequestVerificationToken": token} if token else {}
+            try:
+                with profiler.span("http_post", number=q_data.get('number'), attempt=attempt,
+                                   bytes_sent=sum(len(name.encode("utf-8")) + len(str(value).encode("utf-8"))
+                                                  for name, value in data)) as span:
+                    response = self.session.post(self.form_url, data=data, headers=headers,
+                                                 timeout=HTTP_TIMEOUT_SECONDS)
+                    span["status"] = response.status_code
+            except requests.RequestException as e:
+                if not request_not_sent(e):
+                    raise RuntimeError(f"request failed after it was sent, so the question may have been created; "
+                                       f"check the site before uploading it again ({e})")
+                last_error = f"could not connect: {e}"
+                time.sleep(min(2 ** attempt, 10))
+                continue
+            if response.status_code < 400 and find_form(response.text, "Password") is None:
+                return
+            if response.status_code < 400:
+                raise RuntimeError("the session has expired (the server answered with the login page)")
+            last_error = f"HTTP {response.status_code}"
+            if response.status_code in (400, 403, 419):
+                # Most likely a rejected anti-forgery token: fetch a fresh form and try again
+                self.refresh_form(seen_version=form_version)
+            elif response.status_code >= 500 and response.status_code != 503:
+                raise RuntimeError(f"HTTP {response.status_code}; the question may have been created, "
+                                   f"check the site before uploading it again")
+            elif response.status_code not in (429, 503):
+                break
+            time.sleep(min(2 ** attempt, 10))
+        raise RuntimeError(last_error)
+
+
+def request_not_sent(error):
+    """آیا خطای requests پیش از ارسال درخواست رخ داده است (اتصال به سرور برقرار نشده)"""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+
+
+def upload_questions_http(json_file=JSON_FILE, workers=HTTP_WORKERS, use_selenium_login=False, follow=False):
+    """
+    ارسال مستقیم سوالات با درخواست‌های HTTP هم‌زمان، بدون پر کردن فرم در مرورگر
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with profiler.span("login"):
+        logged_in = selenium_login_cookies(session) if use_selenium_login else http_login(session, LOGIN_URL)
+    if not logged_in:
+        return
+
+    submitter = QuestionFormSubmitter(session, CREATE_QUESTION_URL)
+    submitter.refresh_form()
+    uncached_tags = tag_cache.missing(TAGS_TO_ADD)
+    if uncached_tags:
+        # فرم فقط شناسه تگ‌ها را می‌پذیرد؛ بدون آن‌ها سوالات بدون تگ ساخته می‌شدند
+        print(f"ERROR: No cached IDs for tag(s) {uncached_tags}. Run once with --selenium-login (or in browser "
+              f"mode) to resolve and cache the tag IDs, then use --http again.")
+        return
+    started_at = time.time()
+    uploaded = []
+    failed = []
+    confirmed = []  # (hash, number) سوالاتی که تایید شده‌اند و منتظر ذخیره هستند
+    needs_save = submitter.save_form is not None
+
+    def submit_and_record(q_data, correct_option_index, content_hash):
+        question_number = q_data.get('number')
+        try:
+            with profiler.span("question", number=question_number, chars=len(q_data.get('question', ""))):
+                submitter.submit(q_data, correct_option_index)
+        except Exception as e:
+            failed.append(question_number)
+            print(f"!!! ERROR submitting question number {question_number}: {e}")
+            return
+        if needs_save:
+            confirmed.append((content_hash, question_number))
+            print(f"Question {question_number} confirmed.")
+            return
+        upload_ledger.record(content_hash, question_number)
+        uploaded.append(question_number)
+        print(f"✅ Question {question_number} submitted.")
+
+    # در حالت follow سوالات هم‌زمان با رسیدن از فایل stream ارسال می‌شوند
+    counts = {"skipped": 0, "invalid": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for q_data, correct_option_index, content_hash in iter_uploads(question_source(json_file, follow), counts):
+            executor.submit(submit_and_record, q_data, correct_option_index, content_hash)
+
+    if confirmed:
+        try:
+            submitter.save_confirmed()
+        except Exception as e:
+            failed.extend(question_number for _, question_number in confirmed)
+            print(f"!!! ERROR saving {len(confirmed)} confirmed question(s): {e}")
+        else:
+            for content_hash, question_number in confirmed:
+                upload_ledger.record(content_hash, question_number)
+                uploaded.append(question_number)
+            print(f"✅ {len(confirmed)} confirmed question(s) saved.")
+
+    seconds = time.time() - started_at
+    print(f"\n✅ {len(uploaded)} question(s) submitted over HTTP in {seconds:.1f}s "
+          f"({len(uploaded) / seconds * 60 if seconds else 0:.0f} per minute).")
+    if failed:
+        print(f"WARNING: {len(failed)} question(s) failed: {', '.join(str(n) for n in sorted(failed))}")
+    print_upload_summary(len(uploaded), counts, len(failed), seconds)
+
+
+def replace_site(url, site):
+    """
+    جایگزینی آدرس سایت (scheme و host) در یک URL؛ برای اجرا روی سرور آزمایشی
+    """
+    site_parts = urlsplit(site)
+    return urlunsplit(urlsplit(url)._replace(scheme=site_parts.scheme, netloc=site_parts.netloc))
+
+
+def main():
+    global LOGIN_URL, CREATE_QUESTION_URL, FAST_FORM_FILL, bank_query
+    parser = argparse.ArgumentParser(description="Upload extracted questions to the website.")
+    parser.add_argument("json_file", nargs="?", default=JSON_FILE, help="Questions JSON produced by extractor.py.")
+    parser.add_argument("--http", action="store_true",
+                        help="Post the create question form directly over HTTP instead of filling it in Chrome.")
+    parser.add_argument("--workers", type=int, default=HTTP_WORKERS,
+                        help="Questions submitted in parallel in --http mode (1 keeps the question order).")
+    parser.add_argument("--selenium-login", action="store_true",
+                        help="In --http mode, log in with Chrome and reuse its cookies.")
+    parser.add_argument("--browsers", type=int, default=0,
+                        help="Upload with this many parallel headless Chrome workers sharing one login.")
+    parser.add_argument("--show-browsers", action="store_true",
+                        help="Show the worker browsers instead of running them headless.")
+    parser.add_argument("--report", default=UPLOAD_REPORT_FILE,
+                        help="Where the parallel browser mode writes its merged report (JSON).")
+    parser.add_argument("--follow", action="store_true",
+                        help="Treat json_file as the JSONL stream of a running `extractor.py --stream` and upload "
+                             "questions as they arrive.")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Upload every question, even those already confirmed in the upload ledger.")
+    parser.add_argument("--ledger", default=UPLOAD_LEDGER_FILE,
+                        help="Upload ledger file used to skip questions that were already submitted.")
+    parser.add_argument("--slow-fill", action="store_true",
+                        help="Type every field with send_keys instead of setting the whole form in one script call.")
+    parser.add_argument("--no-tag-cache", action="store_true",
+                        help="Search every tag in the page for every question instead of using cached tag IDs.")
+    parser.add_argument("--refresh-tags", action="store_true",
+                        help="Resolve all tags again and overwrite the tag cache.")
+    parser.add_argument("--profile", nargs="?", const=UPLOAD_PROFILE_FILE, metavar="TRACE",
+                        help=f"Record per-stage timings, print a p50/p95 table and write a Chrome trace "
+                             f"(default: {UPLOAD_PROFILE_FILE}; use a .jsonl name for JSON lines).")
+    parser.add_argument("--bank", nargs="?", const=QUESTION_BANK_FILE, metavar="SQLITE",
+                        help=f"Upload from the SQLite question bank filled by extractor.py --bank instead of "
+                             f"json_file (default: {QUESTION_BANK_FILE}). Near-duplicates are skipped.")
+    parser.add_argument("--source", help="With --bank, only questions from sources matching this SQL LIKE "
+                                         "pattern, e.g. 'soalat%%'.")
+    parser.add_argument("--search", help="With --bank, only questions containing all these words.")
+    parser.add_argument("--limit", type=int, help="With --bank, upload at most this many questions.")
+    parser.add_argument("--include-duplicates", action="store_true",
+                        help="With --bank, also upload questions marked as near-duplicates.")
+    parser.add_argument("--site", help="Use another site root, e.g. http://127.0.0.1:8000 for stub_site.py.")
+    args = parser.parse_args()
+    tag_cache.enabled = not args.no_tag_cache
+    FAST_FORM_FILL = FAST_FORM_FILL and not args.slow_fill
+    upload_ledger.path = args.ledger
+    upload_ledger.resume = not args.no_resume
+    profiler.enabled = args.profile is not None
+    profiler.output_path = args.profile
+    tag_cache.refresh = args.refresh_tags
+    if args.site:
+        LOGIN_URL = replace_site(LOGIN_URL, args.site)
+        CREATE_QUESTION_URL = replace_site(CREATE_QUESTION_URL, args.site)
+    if args.bank:
+        if args.follow:
+            print("ERROR: --follow reads an extractor stream and cannot be combined with --bank.")
+            return
+        bank_query = {"path": args.bank, "source": args.source, "search": args.search,
+                      "include_duplicates": args.include_duplicates, "limit": args.limit}
+
+    if args.http:
+        upload_questions_http(args.json_file, args.workers, args.selenium_login, args.follow)
+    elif args.browsers:
+        if args.follow:
+            print("ERROR: --follow works with the single browser and --http modes, not with --browsers.")
+            return
+        upload_questions_parallel(args.json_file, args.browsers, not args.show_browsers, args.report)
+    else:
+        automate_question_entry(args.json_file, args.follow)
+    profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1739 @@
+import os
+import json
+import argparse
+import io
+import hashlib
+import re
+import time
+import random
+import threading
+import csv
+import multiprocessing
+import subprocess
+import unicodedata
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from .persian_text import to_english_digits, correct_common_spacing_errors
+from .profiling import profiler
+from .model_clients import GeminiModelClient, QuotaExceededError, RecordingModelClient, ReplayModelClient
+from .question_bank import QUESTION_BANK_FILE, QuestionBank, add_extracted_file
+# pdf2image, PIL and google.generativeai are imported where they are first needed, so that
+# importing this module (e.g. from another tool) is cheap and has no side effects
+
+
+# --- 1. Configure Gemini API Key ---
+API_KEY = ""  # Your API Key (read when the first Gemini request is sent, so it can be set after import)
+
+# --- 2. Concurrency settings ---
+MAX_WORKERS = 4  # Number of pages extracted in parallel
+REQUESTS_PER_MINUTE = 15  # Gemini request budget shared by all workers (free tier of gemini-1.5-flash is 15 RPM)
+PAGES_PER_REQUEST = 1  # Question pages sent together in one Gemini request
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket. Every Gemini request takes one token; tokens are
+    refilled at requests_per_minute / 60 per second, up to `burst` tokens.
+    Passing a multiprocessing manager's dict and lock as `state` and `lock` shares
+    one bucket between processes.
+    """
+
+    def __init__(self, requests_per_minute, burst=1, state=None, lock=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.state = state if state is not None else {}
+        self.state.update(tokens=float(self.capacity), updated_at=time.time(), paused_until=0.0)
+        self.lock = lock if lock is not None else threading.Lock()
+
+    def pause(self, seconds):
+        """Holds back every request for `seconds`, e.g. after a quota error."""
+        with self.lock:
+            self.state["paused_until"] = max(self.state["paused_until"], time.time() + seconds)
+            self.state["tokens"] = 0.0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                paused_until = self.state["paused_until"]
+                if now < paused_until:
+                    wait_seconds = paused_until - now
+                else:
+                    # No tokens accumulate while paused
+                    refill_from = max(self.state["updated_at"], paused_until)
+                    tokens = min(self.capacity, self.state["tokens"] + (now - refill_from) * self.rate)
+                    if tokens >= 1:
+                        self.state.update(tokens=tokens - 1, updated_at=now)
+                        return
+                    self.state.update(tokens=tokens, updated_at=now)
+                    wait_seconds = (1 - tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+api_rate_limiter = TokenBucketRateLimiter(REQUESTS_PER_MINUTE)
+
+
+# --- Gemini model settings ---
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+
+# --- Prompt builders ---
+def build_questions_prompt(total_questions_expected_for_prompt=60, answers_are_bolded=False):
+    correct_option_instruction = ""
+    if answers_are_bolded:
+        correct_option_instruction = """4.  `'correct_option'`: **به دقت بررسی کن که کدام یک از چهار گزینه با فونت برجسته (بولد) نمایش داده شده است. شماره آن گزینه (۱، ۲، ۳ یا ۴) را به عنوان مقدار این فیلد قرار بده. اگر هیچ گزینه‌ای بولد نیست یا نمی‌توانی با اطمینان تشخیص دهی، این فیلد را `null` قرار بده.**"""
+    else:
+        correct_option_instruction = """4.  `'correct_option'`: این فیلد را `null` قرار بده (پاسخنامه جداگانه پردازش خواهد شد)."""
+
+    prompt_questions_json_farsi = f"""از این تصویر، تمام سوالات چهارگزینه‌ای (فارسی یا انگلیسی) را با دقت بسیار بالا استخراج کن. این صفحه بخشی از یک آزمون با حدوداً {total_questions_expected_for_prompt} سوال است.
+        برای هر سوال، یک شیء JSON با مشخصات زیر ایجاد کن:
+
+        1.  `'number'`: شماره سوال (در صورت امکان به صورت عدد صحیح، در غیر این صورت به صورت رشته).
+        2.  `'question'`: متن کامل سوال.
+            * **بسیار مهم: این فیلد باید فقط و فقط شامل متن اصلی و کامل صورت سوال باشد. متن گزینه‌ها به هیچ عنوان نباید در این فیلد تکرار شود. اگر بعد از استخراج متوجه شدی که به اشتباه متن گزینه‌ها را هم در این فیلد قرار داده‌ای، حتماً آن‌ها را حذف کن و فقط متن خالص صورت سوال را نگه دار.**
+            * اگر یک متن ریدینگ (گذر متن) وجود دارد که به یک یا چند سوال مرتبط است، متن کامل این گذر را در ابتدای فیلد `'question'` برای هر یک از سوالات مرتبط قرار بده. سپس متن اصلی سوال را بعد از متن ریدینگ (مثلاً با دو خط جدید فاصله) اضافه کن. فیلد جداگانه‌ای برای 'passage' ایجاد نکن.
+            * اگر سوال به یک نمودار، شکل، یا تصویر اشاره دارد، عبارت "(This question has an image, add it manually)" را در ابتدای متن فیلد `'question'` (بعد از متن ریدینگ، در صورت وجود) قرار بده و سپس متن کامل سوال اصلی را بیاور.
+            * فرمول‌های ریاضی در متن سوال باید به صورت متن ساده کاملاً خوانا و خطی بازنویسی شوند. به عنوان مثال، برای توان از `^` (مانند `x^2`)، برای رادیکال از `sqrt()` (مانند `sqrt(a+b)`), برای کسر از `/` همراه با پرانتزگذاری مناسب (مانند `(a+b)/(c-d)`) و برای توابع مثلثاتی از نام‌های رایج (مانند `sin(x)`, `arctan(y)` یا `tg^-1(y)`) استفاده شود. مطلقاً و تحت هیچ شرایطی از تگ‌های HTML (مانند `<sup>` یا `<sub>`) یا فرمت LaTeX برای نمایش فرمول‌ها استفاده نکن.
+            * توجه بسیار ویژه به علائم نگارشی فارسی: در تمام متون فارسی استخراج شده (صورت سوال، گزینه‌ها، متن ریدینگ)، علائم نگارشی استاندارد فارسی، به خصوص استفاده ۱۰۰٪ صحیح از نیم‌فاصله‌ها را رعایت کن. به عنوان مثال، کلماتی مانند «می‌شود»، «خانه‌ها»، «کتاب‌هایم» باید با نیم‌فاصله نوشته شوند، نه «میشود»، «خانه ها» یا «کتاب هایم». همچنین فاصله‌گذاری درست بعد از نقطه، ویرگول و سایر علائم رعایت شود.
+        3.  `'options'`: لیستی شامل چهار رشته که فقط متن خالص گزینه‌های سوال را به ترتیب صحیح (۱، ۲، ۳، ۴) نشان می‌دهند. هرگونه شماره‌گذاری اولیه گزینه (مانند (۱)، الف)، ۱.) باید از ابتدای متن گزینه حذف شود. فرمول‌ها در گزینه‌ها نیز باید مشابه فرمول‌های سوال (یعنی فقط متن ساده و خوانا، بدون HTML یا LaTeX) باشند و علائم نگارشی در گزینه‌ها نیز رعایت شود.
+        {correct_option_instruction} # این متغیر در کد پایتون بر اساس انتخاب کاربر مقداردهی می‌شود
+
+        تمام سوالات موجود در این تصویر را استخراج کن. خروجی را *فقط و فقط* به صورت یک لیست JSON واحد و معتبر از اشیاء برگردان. هر شیء باید یک سوال را نمایندگی کند.
+        مطمئن شو که JSON از نظر ساختاری کاملاً صحیح و خوش‌فرمت است. هیچ متن اضافی، توضیح، یا قالب‌بندی مارک‌داون قبل یا بعد از لیست JSON ننویس.
+        """
+    return prompt_questions_json_farsi
+
+
+def build_batch_questions_prompt(page_numbers, total_questions_expected_for_prompt=60, answers_are_bolded=False):
+    pages_list = "، ".join(str(page_num) for page_num in page_numbers)
+    return build_questions_prompt(total_questions_expected_for_prompt, answers_are_bolded) + f"""
+        **توجه: این درخواست شامل {len(page_numbers)} تصویر از صفحات {pages_list} است. قبل از هر تصویر، شماره صفحه آن به صورت «صفحه N:» آمده است.**
+        دستورالعمل‌های بالا را برای تک‌تک این تصاویر اجرا کن و سوالات همه صفحات را در همان یک لیست JSON برگردان.
+        برای هر سوال، فیلد اضافه `'page'` را نیز اضافه کن که مقدار آن شماره صفحه‌ای (به صورت عدد صحیح) است که سوال در آن آمده است. اگر سوالی از یک صفحه به صفحه بعد ادامه دارد، آن را فقط یک بار و با شماره صفحه‌ای که سوال در آن شروع شده است برگردان.
+        """
+
+
+def build_text_questions_prompt(page_text, total_questions_expected_for_prompt=60):
+    return f"""متن زیر از لایه متنی یک صفحه PDF استخراج شده است و به جای تصویر صفحه ارسال می‌شود. در دستورالعمل‌های زیر، منظور از «این تصویر» همین متن است.
+ترتیب خطوط یا فاصله‌گذاری متن ممکن است به خاطر استخراج از PDF کمی به هم ریخته باشد؛ آن را با دقت بازسازی کن.
+
+""" + build_questions_prompt(total_questions_expected_for_prompt, False) + f"""
+        --- متن صفحه ---
+{page_text}
+        --- پایان متن صفحه ---
+        """
+
+
+def build_answer_key_prompt(total_questions_expected_for_prompt=60):
+    prompt_answer_key_json_farsi = f"""این تصویر به احتمال زیاد حاوی صفحه کلید پاسخنامه یک آزمون چهارگزینه‌ای شامل حدوداً {total_questions_expected_for_prompt} سوال است.
+وظیفه شما این است که با دقت تمام صفحه را تحلیل کرده و **تمام جفت‌های «شماره سوال» به «گزینه صحیح» موجود در کل صفحه** را استخراج کنید (تا سقف {total_questions_expected_for_prompt} پاسخ).
+
+پاسخنامه ممکن است به فرمت‌های مختلفی ارائه شده باشد، مانند:
+- یک جدول با ستون‌هایی برای «شماره سوال» و «گزینه صحیح». **اگر جدول چندین مجموعه از این ستون‌ها را در کنار هم دارد (مثلاً دو یا چند بخش پاسخنامه در یک جدول که هر کدام شامل شماره سوال و گزینه صحیح هستند)، لطفاً تمام جفت‌ها از تمام این بخش‌ها را استخراج کن و در یک شیء JSON واحد ادغام نما.**
+- یک لیست ساده (مثلاً: «۱- الف»، «۲- ۳»، «۳- ب»).
+- دو یا چند ستون از جفت‌های «شماره سوال - گزینه صحیح» که در کنار هم در صفحه چیده شده‌اند.
+
+لطفاً تمام این جفت‌ها را شناسایی کرده و آن‌ها را *فقط و فقط* به صورت یک **شیء JSON واحد و خوش‌ساخت** برگردانید.
+کلیدهای این شیء JSON باید شماره سوالات باشند (به رشته یا عدد صحیح تبدیل شوند).
+مقادیر باید شماره گزینه‌های صحیح مربوطه باشند (به عدد صحیح تبدیل شوند، معمولاً ۱، ۲، ۳ یا ۴).
+
+مثال برای فرمت خروجی (که می‌تواند شامل تمام سوالات باشد):
+{{"1": 2, "2": 4, "3": 1, ..., "31": 1, "32": 3, ..., "{total_questions_expected_for_prompt}": 4}}
+
+- اطمینان حاصل کنید که شماره سوالات به درستی خوانده می‌شوند.
+- اطمینان حاصل کنید که شماره گزینه‌های صحیح به درستی شناسایی می‌شوند (در صورت امکان و لزوم، حروف را به عدد معادل تبدیل کنید، مثلاً الف=۱، ب=۲، ج=۳، د=۴). اگر تبدیل به عدد ممکن نیست، گزینه را به صورت رشته برگردانید.
+- اگر اعداد (چه شماره سوال و چه شماره گزینه) به فارسی یا عربی هستند، لطفاً آن‌ها را در خروجی JSON به ارقام استاندارد انگلیسی (0-9) تبدیل کنید.
+- هرگونه متن دیگر در صفحه، مانند عنوان‌ها، سرتیترها، پانویس‌ها یا شماره صفحات را نادیده بگیرید.
+- اگر هیچ پاسخنامه واضحی در صفحه یافت نشد، یک شیء JSON خالی به این صورت برگردانید: {{}}
+
+در پاسخ خود، *فقط و فقط* شیء JSON را ارائه دهید و از هیچ متن اضافی، توضیح یا قالب‌بندی مارک‌داون استفاده نکنید.
+"""
+    return prompt_answer_key_json_farsi
+
+
+# --- Page image preprocessing settings ---
+# Applied to every page before it is uploaded. The defaults send the page as the original
+# script did (full colour, full size, PIL's default JPEG quality). Smaller presets are
+# listed in benchmarks/payload_size.py; switch to one only after the benchmark shows it
+# keeps the extraction agreement on your recorded pages.
+IMAGE_PREPROCESSING = {
+    "grayscale": False,  # Grayscale is about a third of the colour payload
+    "autocrop": False,  # Trim white margins around the printed content
+    "crop_margin": 24,  # Pixels of white space kept around the content when cropping
+    "max_long_edge": 0,  # Downscale so the longer side is at most this many pixels (0 = keep size)
+    "format": "JPEG",  # "JPEG" or "WEBP"
+    "quality": None,  # None = the encoder's default
+}
+
+IMAGE_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def crop_white_margins(image_pil_object, margin=0, threshold=245):
+    """Returns the image cropped to the bounding box of non-white pixels plus `margin` pixels."""
+    ink_mask = image_pil_object.convert('L').point(lambda v: 255 if v < threshold else 0)
+    bbox = ink_mask.getbbox()
+    if not bbox:
+        return image_pil_object  # Blank page, nothing to crop to
+    left, top, right, bottom = bbox
+    width, height = image_pil_object.size
+    return image_pil_object.crop((max(0, left - margin), max(0, top - margin),
+                                  min(width, right + margin), min(height, bottom + margin)))
+
+
+def preprocess_page_image(image_pil_object, settings=None):
+    """
+    Applies the IMAGE_PREPROCESSING steps (or the given settings) to a rendered page
+    and returns (encoded_bytes, mime_type) ready to be sent to Gemini.
+    """
+    from PIL import Image
+
+    settings = IMAGE_PREPROCESSING if settings is None else settings
+    with profiler.span("encode") as span:
+        image = image_pil_object
+        if settings.get("grayscale"):
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if settings.get("autocrop"):
+            image = crop_white_margins(image, settings.get("crop_margin", 0))
+        max_long_edge = settings.get("max_long_edge") or 0
+        if max_long_edge and max(image.size) > max_long_edge:
+            scale = max_long_edge / max(image.size)
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+        image_format = settings.get("format", "JPEG").upper()
+        save_options = {}
+        if settings.get("quality") is not None:
+            save_options["quality"] = settings["quality"]
+        img_byte_arr = io.BytesIO()
+        image.save(img_byte_arr, format=image_format, **save_options)
+        span["bytes"] = img_byte_arr.tell()
+    return img_byte_arr.getvalue(), IMAGE_MIME_TYPES[image_format]
+
+
+# --- Response cache settings ---
+CACHE_DIR = '.gemini_cache'
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used responses are evicted above this size
+CACHE_LOCK_FILE = '.lock'  # Serializes writes and evictions of processes sharing the cache directory
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of raw Gemini responses. Entries are keyed by a
+    hash of everything that determines the response (page image bytes, prompt, model
+    and extraction settings), and evicted least-recently-used first once the cache
+    grows beyond max_bytes.
+
+    The directory may be shared by several processes (e.g. in batch mode). A read only
+    sets the entry's access time; writes and evictions hold a lock file, and eviction
+    re-scans the directory under it, so one process never deletes an entry that
+    another process is writing and the newest entries are evicted last.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.refresh = False  # When True, cached responses are ignored but fresh ones are still stored
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.total_bytes = None  # Computed on first write
+
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode('utf-8')
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.txt')
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        if self.refresh:
+            with self.lock:
+                self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw_text = f.read()
+            os.utime(path, (time.time(), os.stat(path).st_mtime))  # Mark as recently used (access time only)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return raw_text
+
+    def put(self, key, raw_text):
+        if not self.enabled:
+            return
+        data = raw_text.encode('utf-8')
+        path = self._path(key)
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._directory_lock():
+                if self.total_bytes is None:
+                    self.total_bytes = sum(entry.stat().st_size for entry in self._entries())
+                if os.path.exists(path):
+                    self.total_bytes -= os.path.getsize(path)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self.total_bytes += len(data)
+                if self.total_bytes > self.max_bytes:
+                    self._evict()
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.cache_dir) if entry.is_file() and entry.name.endswith('.txt')]
+
+    @contextmanager
+    def _directory_lock(self):
+        """Exclusive lock on the cache directory, shared with other processes."""
+        with open(os.path.join(self.cache_dir, CACHE_LOCK_FILE), 'a+b') as lock_file:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if os.name == 'nt':
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _evict(self):
+        """Removes the least recently read or written entries. Called with the directory lock held."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+        entries.sort()
+        # Other processes write to the directory too, so the total is recounted
+        self.total_bytes = sum(size for _used_at, size, _path in entries)
+        for _used_at, size, path in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except OSError:
+                continue
+
+    def print_stats(self):
+        if not self.enabled:
+            print("Response cache: disabled.")
+            return
+        print(f"Response cache: {self.hits} hits, {self.misses} misses.")
+
+
+response_cache = ResponseCache()
+
+
+# --- Retry settings ---
+MAX_ATTEMPTS_PER_PAGE = 5  # Attempts per Gemini request before a page is given up
+RETRY_BASE_DELAY = 2.0  # Seconds before the first retry; doubled after every failed attempt
+RETRY_MAX_DELAY = 120.0
+QUOTA_PAUSE_SECONDS = 60.0  # Pipeline-wide pause after a quota error that carries no retry-after hint
+REQUEST_TIMEOUT_SECONDS = 180
+
+
+class GeminiRequestError(Exception):
+    """
+    A failed Gemini request. `kind` is one of 'quota', 'timeout', 'malformed_json',
+    'empty_response' or 'other'; retry_after is the server's hint in seconds, if any.
+    """
+
+    RETRYABLE_KINDS = ('quota', 'timeout', 'malformed_json', 'empty_response')
+
+    def __init__(self, kind, message, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+def parse_retry_after(error):
+    """Extracts a retry delay in seconds from a Gemini error, e.g. 'retry_delay { seconds: 41 }'."""
+    text = str(error)
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', text) or \
+        re.search(r'retry in\s*([\d.]+)\s*s', text, re.IGNORECASE) or \
+        re.search(r'retry-after:?\s*([\d.]+)', text, re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def classify_gemini_exception(error):
+    if isinstance(error, GeminiRequestError):
+        return error
+    if isinstance(error, QuotaExceededError):
+        return GeminiRequestError('quota', str(error), error.retry_after)
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return GeminiRequestError('timeout', str(error), parse_retry_after(error))
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:  # Only the builtin errors above can be recognized without google-api-core
+        return GeminiRequestError('other', f"{type(error).__name__}: {error}")
+    if isinstance(error, google_exceptions.ResourceExhausted) or \
+            isinstance(error, google_exceptions.TooManyRequests):
+        return GeminiRequestError('quota', str(error), parse_retry_after(error))
+    if isinstance(error, (google_exceptions.DeadlineExceeded, google_exceptions.ServiceUnavailable,
+                          google_exceptions.InternalServerError, google_exceptions.GatewayTimeout)):
+        return GeminiRequestError('timeout', str(error), parse_retry_after(error))
+    return GeminiRequestError('other', f"{type(error).__name__}: {error}")
+
+
+class RetryScheduler:
+    """
+    Retries failed Gemini requests with exponential backoff and jitter, honouring the
+    server's retry-after hint. A quota error pauses the shared rate limiter, so every
+    worker waits instead of burning through pages while the quota is exhausted.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS_PER_PAGE, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = {}  # kind -> number of retries
+        self.permanent_failures = {}  # kind -> number of requests given up
+        self.lock = threading.Lock()
+
+    def _count(self, counter, kind):
+        with self.lock:
+            counter[kind] = counter.get(kind, 0) + 1
+
+    def run(self, attempt, label, retry_kinds=GeminiRequestError.RETRYABLE_KINDS):
+        """
+        Calls attempt() until it returns without raising GeminiRequestError, and returns
+        its result. Re-raises the last error once the failure is not retryable or the
+        attempts are exhausted.
+        """
+        for attempt_number in range(1, self.max_attempts + 1):
+            try:
+                return attempt()
+            except GeminiRequestError as error:
+                if error.kind not in retry_kinds or attempt_number == self.max_attempts:
+                    self._count(self.permanent_failures, error.kind)
+                    print(f"ERROR: Gemini request for {label} failed permanently after {attempt_number} "
+                          f"attempt(s) ({error.kind}): {str(error)[:300]}")
+                    raise
+                self._count(self.retries, error.kind)
+                backoff = min(self.max_delay, self.base_delay * 2 ** (attempt_number - 1))
+                delay = backoff / 2 + random.uniform(0, backoff / 2)
+                if error.retry_after is not None:
+                    delay = max(delay, error.retry_after)
+                if error.kind == 'quota':
+                    pause = max(delay, QUOTA_PAUSE_SECONDS if error.retry_after is None else error.retry_after)
+                    print(f"WARNING: Gemini quota exhausted ({label}). Pausing all requests for {pause:.0f} s...")
+                    api_rate_limiter.pause(pause)
+                    delay = 0  # The rate limiter holds this request back together with all others
+                else:
+                    print(f"WARNING: Gemini request for {label} failed ({error.kind}). "
+                          f"Retrying in {delay:.1f} s (attempt {attempt_number + 1}/{self.max_attempts})...")
+                time.sleep(delay)
+
+    def print_stats(self):
+        retried = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.retries.items())) or "none"
+        failed = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.permanent_failures.items())) or "none"
+        print(f"Gemini retries: {retried}. Requests given up: {failed}.")
+
+
+retry_scheduler = RetryScheduler()
+
+# Backend that answers the Gemini requests; replaced by a recording or replaying client
+# with --record-responses / --replay (see model_clients.py). API_KEY is read when the first request is sent.
+model_client = GeminiModelClient(GEMINI_MODEL_NAME, REQUEST_TIMEOUT_SECONDS, lambda: API_KEY)
+
+
+# --- Gemini request helper shared by the extraction functions ---
+def payload_size(contents):
+    """Bytes of the prompt text and inline images in a generate_content request."""
+    return sum(len(part["data"]) if isinstance(part, dict) else len(str(part).encode("utf-8")) for part in contents)
+
+
+def request_gemini_json(contents, cache_key, page_num_for_log, what="questions"):
+    """
+    Returns the raw JSON text Gemini produced for `contents`, from the response cache
+    when possible. Raises GeminiRequestError if the request fails or Gemini gives no
+    usable response.
+    """
+    with profiler.span("cache_lookup", page=page_num_for_log) as span:
+        raw_text = response_cache.get(cache_key)
+        span["hit"] = raw_text is not None
+    if raw_text is not None:
+        return raw_text
+    with profiler.span("rate_limit_wait", page=page_num_for_log):
+        api_rate_limiter.acquire()
+    try:
+        with profiler.span("gemini_request", page=page_num_for_log, what=what,
+                           bytes_sent=payload_size(contents)) as span:
+            response = model_client.generate_json(contents, cache_key, what, page_num_for_log)
+            span["prompt_tokens"] = response.prompt_tokens
+            span["output_tokens"] = response.output_tokens
+        raw_text = response.text
+    except ValueError as e:
+        # response.text raises ValueError when the candidate was blocked or has no text
+        raise GeminiRequestError('empty_response', f"No valid response from Gemini for {what} on page "
+                                                   f"{page_num_for_log}: {e}")
+    except Exception as e:
+        raise classify_gemini_exception(e)
+    if not raw_text:
+        raise GeminiRequestError('empty_response',
+                                 f"No valid response from Gemini for {what} on page {page_num_for_log} (JSON).")
+    return raw_text
+
+
+def parse_questions_json(raw_text, page_num_for_log):
+    """
+    Parses the JSON list of questions in Gemini's response and corrects the spacing of
+    question and option texts. Returns None if no valid JSON list was found.
+    """
+    start_index = raw_text.find('[')
+    end_index = raw_text.rfind(']')
+    if start_index != -1 and end_index != -1 and end_index > start_index:
+        json_text = raw_text[start_index: end_index + 1]
+        try:
+            with profiler.span("parse_json", page=page_num_for_log):
+                questions_data = json.loads(json_text)
+            if isinstance(questions_data, list):
+                with profiler.span("normalize", page=page_num_for_log):
+                    for q_item in questions_data:
+                        if isinstance(q_item, dict):
+                            if 'question' in q_item and isinstance(q_item['question'], str):
+                                q_item['question'] = correct_common_spacing_errors(q_item['question'])
+                            if 'options' in q_item and isinstance(q_item['options'], list):
+                                q_item['options'] = [
+                                    correct_common_spacing_errors(opt) if isinstance(opt, str) else opt for opt in
+                                    q_item['options']]
+            return questions_data if isinstance(questions_data, list) else None
+        except json.JSONDecodeError as json_err:
+            print(f"ERROR: JSONDecodeError for questions on page {page_num_for_log}: {json_err}")
+            print(f"Attempted JSON text (first 300 chars): {json_text[:300]} ...")
+            return None
+    else:
+        print(
+            f"ERROR: Valid JSON list for questions not found in Gemini's response for page {page_num_for_log}.")
+        print(f"Received text for questions (first 300 chars): {raw_text[:300]} ...")
+        return None
+
+
+# --- Function to extract questions as JSON ---
+def get_json_from_image_gemini(image_pil_object, page_num_for_log="", total_questions_expected_for_prompt=60,
+                               answers_are_bolded=False):
+    try:
+        img_byte_arr, image_mime_type = preprocess_page_image(image_pil_object)
+        prompt_questions_json_farsi = build_questions_prompt(total_questions_expected_for_prompt, answers_are_bolded)
+        cache_key = response_cache.make_key(img_byte_arr, prompt_questions_json_farsi, GEMINI_MODEL_NAME,
+                                            answers_are_bolded, total_questions_expected_for_prompt)
+        image_part = {"mime_type": image_mime_type, "data": img_byte_arr}
+
+        def attempt():
+            raw_text = request_gemini_json([prompt_questions_json_farsi, image_part], cache_key, page_num_for_log)
+            questions_data = parse_questions_json(raw_text, page_num_for_log)
+            if questions_data is None:
+                raise GeminiRequestError('malformed_json', f"Invalid questions JSON for page {page_num_for_log}.")
+            response_cache.put(cache_key, raw_text)
+            return questions_data
+
+        return retry_scheduler.run(attempt, f"page {page_num_for_log}")
+    except GeminiRequestError:
+        return None
+    except Exception as e:
+        print(f"ERROR: Exception during Gemini question JSON extraction for page {page_num_for_log}: {e}")
+        return None
+
+
+# --- Function to extract questions from a page's text layer ---
+def get_json_from_text_gemini(page_text, page_num_for_log="", total_questions_expected_for_prompt=60):
+    try:
+        prompt = build_text_questions_prompt(page_text, total_questions_expected_for_prompt)
+        cache_key = response_cache.make_key(prompt.encode('utf-8'), GEMINI_MODEL_NAME, False,
+                                            total_questions_expected_for_prompt)
+
+        def attempt():
+            raw_text = request_gemini_json([prompt], cache_key, page_num_for_log)
+            questions_data = parse_questions_json(raw_text, page_num_for_log)
+            if questions_data is None:
+                raise GeminiRequestError('malformed_json', f"Invalid questions JSON for page {page_num_for_log}.")
+            response_cache.put(cache_key, raw_text)
+            return questions_data
+
+        return retry_scheduler.run(attempt, f"page {page_num_for_log} (text layer)")
+    except GeminiRequestError:
+        return None
+    except Exception as e:
+        print(f"ERROR: Exception during Gemini question JSON extraction for page {page_num_for_log}: {e}")
+        return None
+
+
+# --- Function to extract questions of several pages with one request ---
+def get_json_from_images_gemini_batch(pages, total_questions_expected_for_prompt=60, answers_are_bolded=False):
+    """
+    Sends several (page_number, image) pairs in one Gemini request and splits the
+    questions back per page using the 'page' field Gemini is asked to add.
+    Returns {page_number: questions_list}, or None if the combined response cannot be
+    parsed or split reliably (the caller then falls back to single-page requests).
+    """
+    page_numbers = [page_num for page_num, _ in pages]
+    pages_for_log = ",".join(str(page_num) for page_num in page_numbers)
+    try:
+        prompt = build_batch_questions_prompt(page_numbers, total_questions_expected_for_prompt, answers_are_bolded)
+        contents = [prompt]
+        cache_parts = [prompt, GEMINI_MODEL_NAME, answers_are_bolded, total_questions_expected_for_prompt]
+        for page_num, image_pil_object in pages:
+            img_byte_arr, image_mime_type = preprocess_page_image(image_pil_object)
+            contents.append(f"صفحه {page_num}:")
+            contents.append({"mime_type": image_mime_type, "data": img_byte_arr})
+            cache_parts.append(img_byte_arr)
+        cache_key = response_cache.make_key(*cache_parts)
+        # Only transient failures are retried here; other failures fall back to single-page requests
+        raw_text = retry_scheduler.run(lambda: request_gemini_json(contents, cache_key, pages_for_log),
+                                       f"pages {pages_for_log}", retry_kinds=('quota', 'timeout', 'empty_response'))
+        questions_data = parse_questions_json(raw_text, pages_for_log)
+        if questions_data is None:
+            return None
+
+        questions_by_page = {page_num: [] for page_num in page_numbers}
+        for q_item in questions_data:
+            try:
+                page_num = int(to_english_digits(q_item.pop('page')))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                page_num = None
+            if page_num not in questions_by_page:
+                print(f"ERROR: Question without a valid 'page' tag in batched response for pages {pages_for_log}: "
+                      f"{str(q_item)[:100]}...")
+                return None
+            questions_by_page[page_num].append(q_item)
+        response_cache.put(cache_key, raw_text)
+        return questions_by_page
+    except GeminiRequestError:
+        return None
+    except Exception as e:
+        print(f"ERROR: Exception during batched Gemini question JSON extraction for pages {pages_for_log}: {e}")
+        return None
+
+
+def clean_answer_key(answer_data, page_num_for_log=""):
+    """
+    Converts a {question number: option} mapping (keys and values possibly in Persian/Arabic
+    digits or as letters الف/ب/ج/د, a-d) into {int: 1..4}, dropping invalid entries.
+    """
+    cleaned_answer_key = {}
+    for k, v_raw in answer_data.items():
+        try:
+            q_num = int(to_english_digits(str(k)))
+            v_str_cleaned = to_english_digits(str(v_raw)).strip()
+            correct_opt = -1
+            if v_str_cleaned.isdigit() and 1 <= int(v_str_cleaned) <= 4:
+                correct_opt = int(v_str_cleaned)
+            elif isinstance(v_raw, str):
+                v_char = v_raw.strip()
+                if v_char == "الف" or v_char.lower() == "a" or v_char == "۱":
+                    correct_opt = 1
+                elif v_char == "ب" or v_char.lower() == "b" or v_char == "۲":
+                    correct_opt = 2
+                elif v_char == "ج" or v_char.lower() == "c" or v_char == "۳":
+                    correct_opt = 3
+                elif v_char == "د" or v_char.lower() == "d" or v_char == "۴":
+                    correct_opt = 4
+            if correct_opt != -1:
+                cleaned_answer_key[q_num] = correct_opt
+            else:
+                print(
+                    f"WARNING: Invalid correct option '{v_raw}' for question {q_num} in answer key JSON (page {page_num_for_log}).")
+        except ValueError:
+            print(
+                f"WARNING: Invalid number format in answer key JSON: key='{k}', value='{v_raw}' (page {page_num_for_log}).")
+    return cleaned_answer_key
+
+
+def parse_answer_key_json(raw_text, page_num_for_log):
+    """
+    Parses and cleans the answer key JSON object in Gemini's response.
+    Returns None if the response is not a valid JSON object.
+    """
+    if raw_text.startswith("```json"):
+        raw_text = raw_text[7:]
+    if raw_text.endswith("```"):
+        raw_text = raw_text[:-3]
+    raw_text = raw_text.strip()
+    if not raw_text:
+        print(f"WARNING: Gemini's response for answer key on page {page_num_for_log} was empty after strip.")
+        return None
+    try:
+        answer_data = json.loads(raw_text)
+        if isinstance(answer_data, dict):
+            return clean_answer_key(answer_data, page_num_for_log)
+        else:
+            print(
+                f"ERROR: Gemini's response for answer key on page {page_num_for_log} was not a JSON object: {type(answer_data)}")
+            print(f"Received text for answer key (first 300 chars): {raw_text[:300]}...")
+            return None
+    except json.JSONDecodeError as json_err:
+        print(f"ERROR: JSONDecodeError for answer key on page {page_num_for_log}: {json_err}")
+        print(f"Attempted JSON text for answer key (first 300 chars): {raw_text[:300]} ...")
+        return None
+
+
+# --- Function to extract answer key as JSON ---
+def get_answer_key_json_from_gemini(image_pil_object, page_num_for_log="", total_questions_expected_for_prompt=60):
+    try:
+        img_byte_arr, image_mime_type = preprocess_page_image(image_pil_object)
+        prompt_answer_key_json_farsi = build_answer_key_prompt(total_questions_expected_for_prompt)
+        cache_key = response_cache.make_key(img_byte_arr, prompt_answer_key_json_farsi, GEMINI_MODEL_NAME,
+                                            False, total_questions_expected_for_prompt)
+        image_part = {"mime_type": image_mime_type, "data": img_byte_arr}
+
+        def attempt():
+            raw_text = request_gemini_json([prompt_answer_key_json_farsi, image_part], cache_key, page_num_for_log,
+                                           what="answer key")
+            answer_key = parse_answer_key_json(raw_text, page_num_for_log)
+            if answer_key is None:
+                raise GeminiRequestError('malformed_json', f"Invalid answer key JSON for page {page_num_for_log}.")
+            response_cache.put(cache_key, raw_text)
+            return answer_key
+
+        return retry_scheduler.run(attempt, f"answer key page {page_num_for_log}")
+    except GeminiRequestError:
+        return {}
+    except Exception as e:
+        print(f"ERROR: Exception during Gemini answer key JSON extraction for page {page_num_for_log}: {e}")
+        return {}
+
+
+# --- PDF rendering settings ---
+RENDER_DPI = 300
+RENDER_WINDOW_PAGES = 4  # Pages rasterized per pdf2image call
+MAX_PAGES_IN_FLIGHT = MAX_WORKERS * 2  # Rendered pages allowed to wait for or be under extraction
+
+
+def iter_pdf_pages(pdf_filename, page_count, dpi=None, window=None, skip_pages=()):
+    """
+    Lazily rasterizes the PDF `window` pages at a time (using first_page/last_page)
+    and yields (page_number, PIL image) pairs, so only one window is held by the renderer.
+    Pages in skip_pages (e.g. already journaled ones) are not rendered at all.
+    dpi and window default to the current RENDER_DPI and RENDER_WINDOW_PAGES.
+    """
+    from pdf2image import convert_from_path
+
+    dpi = dpi or RENDER_DPI
+    window = window or RENDER_WINDOW_PAGES
+
+    first_page = 1
+    while first_page <= page_count:
+        if first_page in skip_pages:
+            first_page += 1
+            continue
+        last_page = first_page
+        while last_page < page_count and last_page - first_page + 1 < window and last_page + 1 not in skip_pages:
+            last_page += 1
+        with profiler.span("render", first_page=first_page, pages=last_page - first_page + 1):
+            window_pages = convert_from_path(pdf_filename, dpi=dpi, first_page=first_page, last_page=last_page,
+                                             poppler_path=None)
+        page_num = first_page
+        while window_pages:
+            yield page_num, window_pages.pop(0)
+            page_num += 1
+        first_page = last_page + 1
+
+
+# --- Text layer settings ---
+USE_TEXT_LAYER = True  # Use the PDF's own text instead of page images for born-digital pages
+TEXT_LAYER_MIN_LETTERS = 200  # Letters a page's text layer needs before it is trusted
+TEXT_LAYER_MAX_BAD_CHAR_RATIO = 0.02  # Share of unmapped/garbled characters tolerated in the text layer
+TEXT_LAYER_MIN_FIGURE_PIXELS = 150 * 150  # Embedded images at least this large count as figures
+ANSWER_KEY_MIN_PAIR_RATIO = 0.9  # Share of expected answers a local answer key parse must find
+
+
+class TextLayerPage:
+    """
+    A page whose PDF text layer is used instead of a rendered image. render() rasterizes
+    it on demand for the cases that still need the vision model.
+    """
+
+    def __init__(self, pdf_filename, page_num, text):
+        self.pdf_filename = pdf_filename
+        self.page_num = page_num
+        self.text = text
+
+    def render(self):
+        from pdf2image import convert_from_path
+
+        with profiler.span("render", first_page=self.page_num, pages=1):
+            return convert_from_path(self.pdf_filename, dpi=RENDER_DPI, first_page=self.page_num,
+                                     last_page=self.page_num, poppler_path=None)[0]
+
+
+def read_text_layer(pdf_filename):
+    """Returns the text of every page via poppler's pdftotext, as a list indexed from page 1 at [0]."""
+    with profiler.span("text_layer"):
+        completed = subprocess.run(["pdftotext", "-enc", "UTF-8", "-layout", pdf_filename, "-"],
+                                   capture_output=True, check=True)
+    # Arabic presentation forms (common in Persian PDFs) are folded to regular letters by NFKC
+    text = unicodedata.normalize("NFKC", completed.stdout.decode("utf-8", errors="replace"))
+    return text.split("\f")
+
+
+def pages_with_figures(pdf_filename):
+    """Returns the page numbers that embed at least one figure-sized image (via pdfimages -list)."""
+    completed = subprocess.run(["pdfimages", "-list", pdf_filename], capture_output=True, check=True)
+    figure_pages = set()
+    for line in completed.stdout.decode("utf-8", errors="replace").splitlines()[2:]:
+        columns = line.split()
+        if len(columns) < 5 or not columns[0].isdigit():
+            continue
+        page_num, width, height = int(columns[0]), int(columns[3]), int(columns[4])
+        if width * height >= TEXT_LAYER_MIN_FIGURE_PIXELS:
+            figure_pages.add(page_num)
+    return figure_pages
+
+
+def text_layer_is_usable(text):
+    letters = sum(1 for ch in text if ch.isalpha())
+    if letters < TEXT_LAYER_MIN_LETTERS:
+        return False
+    bad_chars = sum(1 for ch in text if ch == '\ufffd' or unicodedata.category(ch) in ('Co', 'Cn'))
+    return bad_chars / max(1, len(text)) <= TEXT_LAYER_MAX_BAD_CHAR_RATIO
+
+
+def detect_text_layer_pages(pdf_filename, answer_key_page_number, answers_are_bolded):
+    """
+    Returns {page_number: text} for pages that can skip rasterization: the answer key page
+    if it has a usable text layer, and question pages with a usable text layer and no
+    figures. Question pages are never included when answers are marked in bold, since
+    bold type is not visible in the text layer.
+    """
+    try:
+        page_texts = read_text_layer(pdf_filename)
+        figure_pages = pages_with_figures(pdf_filename) if not answers_are_bolded else set()
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"WARNING: Could not read the PDF text layer ({e}). All pages will be rendered as images.")
+        return {}
+    text_pages = {}
+    for index, text in enumerate(page_texts):
+        page_num = index + 1
+        if not text_layer_is_usable(text):
+            continue
+        if page_num == answer_key_page_number and not answers_are_bolded:
+            text_pages[page_num] = text
+        elif not answers_are_bolded and page_num not in figure_pages:
+            text_pages[page_num] = text
+    return text_pages
+
+
+def parse_answer_key_text(text, page_num_for_log="", total_questions_expected=None):
+    """
+    Parses an answer key from plain text such as «۱- الف  ۲- ۳  3) b» and cleans it the
+    same way as Gemini's answer key JSON. Returns {question number: option}, or None if
+    the text cannot be trusted: a question number that occurs with two different options,
+    or numbers beyond total_questions_expected, mean that the pairs were mis-read (e.g.
+    from a multi-column layout) and the page should go to Gemini instead.
+    """
+    text = to_english_digits(text)
+    pairs = {}
+    # Number and option must be on the same line; across line breaks they belong to different columns
+    for q_num, option in re.findall(r'(?<![\d.])(\d{1,3})[ \t]*[-–.:)\]]?[ \t]*(الف|ب|ج|د|[1-4]|[a-dA-D])(?![\w])',
+                                    text):
+        if pairs.setdefault(q_num, option) != option:
+            print(f"INFO: Question {q_num} has two different answers in the text layer of page {page_num_for_log}.")
+            return None
+    answers = clean_answer_key(pairs, page_num_for_log)
+    if total_questions_expected and any(not 1 <= q_num <= total_questions_expected for q_num in answers):
+        print(f"INFO: The text layer of page {page_num_for_log} has answer numbers outside "
+              f"1-{total_questions_expected}.")
+        return None
+    return answers
+
+
+def iter_pages(pdf_filename, page_count, text_layer_pages=None, skip_pages=()):
+    """
+    Yields (page_number, page) in page order, where page is a TextLayerPage for pages in
+    text_layer_pages and a lazily rendered PIL image for all others.
+    """
+    text_layer_pages = text_layer_pages or {}
+    pending_text_pages = sorted(page_num for page_num in text_layer_pages if page_num not in skip_pages)
+    rendered_pages = iter_pdf_pages(pdf_filename, page_count, skip_pages=set(skip_pages) | set(text_layer_pages))
+    for page_num, page_pil_object in rendered_pages:
+        while pending_text_pages and pending_text_pages[0] < page_num:
+            text_page_num = pending_text_pages.pop(0)
+            yield text_page_num, TextLayerPage(pdf_filename, text_page_num, text_layer_pages[text_page_num])
+        yield page_num, page_pil_object
+    for text_page_num in pending_text_pages:
+        yield text_page_num, TextLayerPage(pdf_filename, text_page_num, text_layer_pages[text_page_num])
+
+
+# --- Page pre-classifier settings ---
+SKIP_NON_QUESTION_PAGES = True  # Skip blank pages and text pages without questions before calling Gemini
+CLASSIFIER_THUMBNAIL_SIZE = 1024  # Pages are classified on a thumbnail with this long edge (small text must survive)
+CLASSIFIER_INK_CONTRAST = 60  # Pixels this much darker than the paper (the median gray level) count as ink
+BLANK_PAGE_MAX_INK_RATIO = 0.0002  # A page is blank only with less ink than this share of pixels...
+BLANK_PAGE_MAX_STDDEV = 3.0  # ...and almost no variation in brightness
+MIN_QUESTION_MARKERS = 2  # Numbered items/option markers a text page needs to count as a question page
+
+
+class PageClassifier:
+    """
+    Cheap local classification of pages before they are sent to Gemini. Rendered pages
+    are 'blank' only if they have (almost) no ink and no variation in brightness on a
+    thumbnail; any visible content sends the page to Gemini. Text layer pages are checked
+    for question numbering and option markers. Pages classified as 'blank' or
+    'non_question' are skipped and listed as needing review at the end of the run.
+    """
+
+    QUESTION_MARKER_PATTERN = re.compile(
+        r'(?m)^\s*\(?\d{1,3}\s*[-.)]|\(\s*[1-4](?!\d)|(?<!\w)[1-4]\s*\)|(?<!\w)(?:الف|ب|ج|د)\s*[-)]')
+
+    def __init__(self):
+        self.enabled = SKIP_NON_QUESTION_PAGES
+
+    def classify(self, page):
+        """Returns (label, details) where label is 'question', 'blank' or 'non_question'."""
+        if isinstance(page, TextLayerPage):
+            markers = len(self.QUESTION_MARKER_PATTERN.findall(to_english_digits(page.text)))
+            label = 'question' if markers >= MIN_QUESTION_MARKERS else 'non_question'
+            return label, f"text layer, {markers} question/option markers"
+        # Shrink the full-resolution render first (reduce returns a new image and leaves the
+        # page to be uploaded untouched), so the grayscale conversion only touches the thumbnail
+        factor = max(1, max(page.size) // CLASSIFIER_THUMBNAIL_SIZE)
+        thumbnail = page.reduce(factor).convert('L')
+        thumbnail.thumbnail((CLASSIFIER_THUMBNAIL_SIZE, CLASSIFIER_THUMBNAIL_SIZE))
+        from PIL import ImageStat
+        statistics = ImageStat.Stat(thumbnail)
+        histogram = thumbnail.histogram()
+        paper_level = statistics.median[0]
+        ink_ratio = sum(histogram[:max(0, paper_level - CLASSIFIER_INK_CONTRAST)]) / max(1, sum(histogram))
+        stddev = statistics.stddev[0]
+        details = f"ink {ink_ratio:.3%}, stddev {stddev:.1f}"
+        if ink_ratio < BLANK_PAGE_MAX_INK_RATIO and stddev < BLANK_PAGE_MAX_STDDEV:
+            return 'blank', details
+        return 'question', details
+
+    def should_skip(self, page, current_page_num):
+        """Classifies and logs a page; returns the label if the page should be skipped, else None."""
+        if not self.enabled:
+            return None
+        label, details = self.classify(page)
+        if label == 'question':
+            print(f"Page {current_page_num} pre-classified as question page ({details}).")
+            return None
+        print(f"Page {current_page_num} pre-classified as {label} ({details}). Skipped without calling Gemini.")
+        return label
+
+
+page_classifier = PageClassifier()
+
+
+# --- Checkpoint journal ---
+class PageJournal:
+    """
+    Append-only JSONL journal of finished pages. Each page result is written as one
+    line and fsynced as soon as the page is done, so an interrupted run can be resumed
+    without calling the API again for those pages. The first line records the
+    extraction settings; a journal written with different settings is not resumed.
+    """
+
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.file = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Returns {page_number: result} for the pages recorded by a previous run."""
+        results = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return results
+        if not lines:
+            return results
+        try:
+            header = json.loads(lines[0])
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("settings") != self.settings:
+            print(f"WARNING: Journal '{self.path}' was written with different settings and will not be resumed.")
+            return results
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line of an interrupted run
+            record["answers"] = {int(k): v for k, v in record.get("answers", {}).items()}
+            results[record["page"]] = record
+        return results
+
+    def open(self, resume=False):
+        if resume and os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                ends_with_newline = f.read(1) == b"\n"
+            self.file = open(self.path, "a", encoding="utf-8")
+            if not ends_with_newline:
+                # Start a fresh line after a record cut short by an interrupted run
+                self.file.write("\n")
+        else:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.file.write(json.dumps({"settings": self.settings}, ensure_ascii=False) + "\n")
+        self._sync()
+
+    def record(self, result):
+        line = json.dumps(result, ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+            self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# --- Streaming output ---
+class QuestionStream:
+    """
+    Appends extracted questions to a JSON lines file while the PDF is still being
+    processed, so `automator.py --follow` can start uploading before extraction ends.
+    Pages are written in page order as soon as all earlier pages are done. Each line is
+    one record:
+
+        {"type": "question", "page": 3, "question": {...}}
+        {"type": "answer_key", "page": 8, "answers": {"1": 2, ...}}
+        {"type": "end", "questions": 60, "failed_pages": [], "error": null}
+
+    Questions after a known answer key get their correct_option filled in here; earlier
+    ones are written without it and joined by the reader when the answer_key record arrives.
+    """
+
+    def __init__(self, path, answers_are_bolded):
+        self.path = path
+        self.answers_are_bolded = answers_are_bolded
+        self.file = None
+        self.lock = threading.Lock()
+        self.pending = {}  # Finished pages waiting for an earlier page
+        self.next_page = 1
+        self.answer_key = {}
+        self.seen_numbers = set()
+        self.question_count = 0
+
+    def open(self):
+        self.file = open(self.path, "w", encoding="utf-8")
+        print(f"INFO: Questions are streamed to '{self.path}' as pages finish.")
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _emit(self, result):
+        if result["answers"]:
+            self.answer_key.update(result["answers"])
+            self._write({"type": "answer_key", "page": result["page"], "answers": result["answers"]})
+        for q in result["questions"]:
+            q_number = q.get("number")
+            if q_number is None or q_number in self.seen_numbers:
+                continue
+            self.seen_numbers.add(q_number)
+            if not self.answers_are_bolded and q_number in self.answer_key:
+                q = dict(q, correct_option=self.answer_key[q_number])
+            self._write({"type": "question", "page": result["page"], "question": q})
+            self.question_count += 1
+
+    def add(self, result):
+        """Takes one page result; writes it and any following finished pages once all earlier pages are written."""
+        with self.lock:
+            self.pending[result["page"]] = result
+            while self.next_page in self.pending:
+                self._emit(self.pending.pop(self.next_page))
+                self.next_page += 1
+            self.file.flush()
+
+    def finish(self, failed_pages=(), error=None):
+        """Writes the remaining pages and the end record, then closes the file."""
+        if self.file is None:
+            return
+        with self.lock:
+            for page_num in sorted(self.pending):
+                self._emit(self.pending.pop(page_num))
+            self._write({"type": "end", "questions": self.question_count, "failed_pages": list(failed_pages),
+                         "error": error})
+            self.file.close()
+            self.file = None
+
+
+# --- Page processing (runs inside worker threads) ---
+def extract_answer_key_page(page_pil_object, current_page_num, total_questions_expected):
+    if isinstance(page_pil_object, TextLayerPage):
+        extracted_answers = parse_answer_key_text(page_pil_object.text, str(current_page_num),
+                                                  total_questions_expected)
+        if extracted_answers is None:
+            print(f"INFO: The text layer of page {current_page_num} does not give a consistent answer key. "
+                  f"Rendering the page for Gemini instead...")
+        elif len(extracted_answers) >= ANSWER_KEY_MIN_PAIR_RATIO * total_questions_expected:
+            print(f"{len(extracted_answers)} answers parsed locally from the text layer of answer key page "
+                  f"{current_page_num} (no API call).")
+            return extracted_answers
+        else:
+            print(f"INFO: Only {len(extracted_answers)} answers found in the text layer of page {current_page_num}. "
+                  f"Rendering the page for Gemini instead...")
+        page_pil_object = page_pil_object.render()
+    print(f"Page {current_page_num} identified as separate answer key page. Extracting answer key as JSON...")
+    extracted_answers = get_answer_key_json_from_gemini(page_pil_object, str(current_page_num),
+                                                        total_questions_expected)
+    if extracted_answers:
+        print(f"{len(extracted_answers)} answers extracted from answer key page {current_page_num}.")
+        return extracted_answers
+    print(f"ERROR: No valid answer key JSON extracted from page {current_page_num}.")
+    return {}
+
+
+def extract_question_page(page_pil_object, current_page_num, total_questions_expected, answers_are_bolded):
+    # Process as a question page (which might include detecting bolded answers if answers_are_bolded is True)
+    if isinstance(page_pil_object, TextLayerPage):
+        print(f"Processing page {current_page_num} for questions from its text layer...")
+        page_questions_list = get_json_from_text_gemini(page_pil_object.text, str(current_page_num),
+                                                        total_questions_expected)
+        return validate_page_questions(page_questions_list, current_page_num, answers_are_bolded)
+    print(f"Processing page {current_page_num} for questions...")
+    page_questions_list = get_json_from_image_gemini(page_pil_object, str(current_page_num),
+                                                     total_questions_expected, answers_are_bolded)
+    return validate_page_questions(page_questions_list, current_page_num, answers_are_bolded)
+
+
+def validate_page_questions(page_questions_list, current_page_num, answers_are_bolded):
+    """
+    Keeps the well-formed questions of one page. Returns None if the page's request
+    failed (page_questions_list is None).
+    """
+    if not page_questions_list:
+        print(f"ERROR: No questions (JSON) extracted or invalid format from page {current_page_num}.")
+        return None if page_questions_list is None else []
+
+    valid_questions = []
+    for q_data in page_questions_list:
+        if isinstance(q_data, dict) and \
+                'number' in q_data and \
+                'question' in q_data and \
+                'options' in q_data and \
+                isinstance(q_data['options'], list) and \
+                len(q_data['options']) == 4:
+            try:
+                q_data['number'] = int(to_english_digits(q_data['number']))
+                # If answers are bolded, correct_option should already be in q_data from Gemini
+                if not answers_are_bolded:
+                    q_data['correct_option'] = None  # Initialize if not expecting bold detection
+                elif 'correct_option' not in q_data:  # If bold detection was expected but failed
+                    q_data['correct_option'] = None
+                    print(
+                        f"WARNING: Expected bolded answer for Q{q_data['number']} on page {current_page_num} but not found by Gemini.")
+
+                valid_questions.append(q_data)
+            except ValueError:
+                print(
+                    f"WARNING: Invalid question number '{q_data.get('number')}' in JSON for page {current_page_num}.")
+        else:
+            print(
+                f"WARNING: Invalid question JSON structure from page {current_page_num}: {str(q_data)[:100]}...")
+    print(f"{len(valid_questions)} valid questions found on page {current_page_num}.")
+    return valid_questions
+
+
+def process_page(page_pil_object, current_page_num, total_questions_expected, answer_key_page_number,
+                 answers_are_bolded, classify=True):
+    """
+    Extracts one page and returns its result as a dict, so that results of
+    concurrently processed pages can be merged afterwards in page order.
+    `failed` is set when the Gemini request for the page did not produce usable JSON;
+    `skipped` holds the pre-classifier's label for pages that were not sent at all.
+    """
+    with profiler.span("page", page=current_page_num):
+        print(f"\n--- Processing page {current_page_num} ---")
+        result = {"page": current_page_num, "questions": [], "answers": {}, "failed": False}
+        if not answers_are_bolded and answer_key_page_number != 0 and current_page_num == answer_key_page_number:
+            result["answers"] = extract_answer_key_page(page_pil_object, current_page_num, total_questions_expected)
+            result["failed"] = not result["answers"]
+        else:
+            skipped_label = page_classifier.should_skip(page_pil_object, current_page_num) if classify else None
+            if skipped_label:
+                result["skipped"] = skipped_label
+                return result
+            page_questions = extract_question_page(page_pil_object, current_page_num, total_questions_expected,
+                                                   answers_are_bolded)
+            result["questions"] = page_questions or []
+            result["failed"] = page_questions is None
+        return result
+
+
+def process_page_batch(pages, total_questions_expected, answer_key_page_number, answers_are_bolded):
+    """
+    Extracts several question pages with a single Gemini request and returns one
+    result per page, like process_page. Falls back to one request per page if the
+    combined response cannot be split back into pages.
+    """
+    if len(pages) == 1:
+        page_num, page_pil_object = pages[0]
+        return [process_page(page_pil_object, page_num, total_questions_expected, answer_key_page_number,
+                             answers_are_bolded)]
+    results = []
+    pages_to_send = []
+    for page_num, page_pil_object in pages:
+        skipped_label = page_classifier.should_skip(page_pil_object, page_num)
+        if skipped_label:
+            results.append({"page": page_num, "questions": [], "answers": {}, "failed": False,
+                            "skipped": skipped_label})
+        else:
+            pages_to_send.append((page_num, page_pil_object))
+    if len(pages_to_send) <= 1:
+        return results + [process_page(page_pil_object, page_num, total_questions_expected, answer_key_page_number,
+                                       answers_are_bolded, classify=False)
+                          for page_num, page_pil_object in pages_to_send]
+    pages = pages_to_send
+    page_numbers = [page_num for page_num, _ in pages]
+    print(f"\n--- Processing pages {page_numbers[0]}-{page_numbers[-1]} in one request ---")
+    with profiler.span("page_batch", first_page=page_numbers[0], pages=len(page_numbers)):
+        questions_by_page = get_json_from_images_gemini_batch(pages, total_questions_expected, answers_are_bolded)
+    if questions_by_page is None:
+        print(f"WARNING: Batched request for pages {page_numbers[0]}-{page_numbers[-1]} failed. "
+              f"Falling back to one request per page...")
+        return results + [process_page(page_pil_object, page_num, total_questions_expected, answer_key_page_number,
+                                       answers_are_bolded, classify=False) for page_num, page_pil_object in pages]
+    for page_num in page_numbers:
+        page_questions = validate_page_questions(questions_by_page[page_num], page_num, answers_are_bolded)
+        results.append({"page": page_num, "questions": page_questions or [], "answers": {},
+                        "failed": page_questions is None})
+    return results
+
+
+def iter_page_batches(page_iterator, pages_per_request, answer_key_page_number, answers_are_bolded):
+    """
+    Groups consecutive question pages into batches of up to pages_per_request pages.
+    The answer key page and text layer pages are always sent on their own.
+    """
+    batch = []
+    for current_page_num, page_pil_object in page_iterator:
+        is_single_page = isinstance(page_pil_object, TextLayerPage) or (
+            not answers_are_bolded and answer_key_page_number != 0 and current_page_num == answer_key_page_number)
+        if batch and (is_single_page or current_page_num != batch[-1][0] + 1):
+            yield batch
+            batch = []
+        batch.append((current_page_num, page_pil_object))
+        if is_single_page or len(batch) >= pages_per_request:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def extract_pages_concurrently(page_source, total_questions_expected, answer_key_page_number, answers_are_bolded,
+                               max_workers=None, max_pages_in_flight=None, journal=None,
+                               completed_results=None, pages_per_request=PAGES_PER_REQUEST, stream=None):
+    """
+    Runs process_page over (page_number, image) pairs from page_source on a thread pool.
+    At most max_pages_in_flight rendered pages are queued or being extracted at once, so
+    the renderer waits for the workers instead of holding the whole PDF in memory.
+    Gemini calls are throttled by the shared api_rate_limiter. Each successful page is
+    written to `journal` as soon as it finishes; completed_results holds pages restored
+    from a previous run's journal. All results are merged in page order.
+    With pages_per_request > 1, consecutive question pages are sent to Gemini together.
+    Every page result is also passed to `stream` (a QuestionStream), if given.
+    max_workers and max_pages_in_flight default to the current MAX_WORKERS and
+    MAX_PAGES_IN_FLIGHT (but at least one page per worker).
+    """
+    max_workers = max_workers or MAX_WORKERS
+    max_pages_in_flight = max(max_pages_in_flight or MAX_PAGES_IN_FLIGHT, max_workers)
+    results = dict(completed_results or {})
+    if results:
+        print(f"{len(results)} pages restored from the journal and will not be sent to Gemini again.")
+    if stream is not None:
+        for page_num in sorted(results):
+            stream.add(results[page_num])
+    print(f"Extracting pages with {max_workers} worker(s), "
+          f"at most {REQUESTS_PER_MINUTE} requests per minute...")
+
+    def process_and_record(pages):
+        batch_results = process_page_batch(pages, total_questions_expected, answer_key_page_number,
+                                           answers_are_bolded)
+        for result in batch_results:
+            # Skipped pages are not journaled, so --resume --no-skip-pages can still send them
+            if journal is not None and not result["failed"] and not result.get("skipped"):
+                journal.record(result)
+            if stream is not None:
+                stream.add(result)
+        return batch_results
+
+    # Every rendered page holds one slot until its batch is done, so a batch must fit
+    max_pages_in_flight = max(max_pages_in_flight, pages_per_request)
+    in_flight = threading.BoundedSemaphore(max_pages_in_flight)
+
+    worker_failed = threading.Event()
+
+    def batch_done(future, count):
+        if not future.cancelled() and future.exception() is not None:
+            worker_failed.set()  # Stop rendering; the error is raised below from future.result()
+        for _ in range(count):
+            in_flight.release()
+
+    def throttled_pages():
+        for page in page_source:
+            yield page
+            in_flight.acquire()  # Backpressure: blocks rendering while too many pages are pending
+
+    futures = []
+    stopped = False
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        in_flight.acquire()
+        for batch in iter_page_batches(throttled_pages(), pages_per_request, answer_key_page_number,
+                                       answers_are_bolded):
+            future = executor.submit(process_and_record, batch)
+            future.add_done_callback(lambda done, pages_done=len(batch): batch_done(done, pages_done))
+            futures.append(future)
+            del batch  # Only the worker keeps references to the rendered pages
+            if worker_failed.is_set():
+                break
+
+        for future in futures:
+            for result in future.result():
+                results[result["page"]] = result
+    except KeyboardInterrupt:
+        stopped = True
+        print("\nInterrupted. Waiting for pages already sent to Gemini; queued pages are cancelled...")
+        raise
+    except Exception as e:
+        stopped = True
+        print(f"\nPage extraction stopped ({type(e).__name__}). "
+              "Waiting for pages already sent to Gemini; queued pages are cancelled...")
+        raise
+    finally:
+        # On success every future is already done, so there is nothing left to cancel
+        executor.shutdown(wait=True, cancel_futures=True)
+        if stopped and journal is not None:
+            print("Finished pages are saved in the journal. Run again with --resume to continue.")
+
+    all_questions = []
+    answer_key = {}  # This will be populated if a separate answer key page is processed
+    for page_num in sorted(results):
+        all_questions.extend(results[page_num]["questions"])
+        answer_key.update(results[page_num]["answers"])
+
+    skipped_pages = sorted(page_num for page_num, result in results.items() if result.get("skipped"))
+    if skipped_pages:
+        print(f"\nWARNING: {len(skipped_pages)} page(s) were skipped by the pre-classifier and need review: "
+              f"{', '.join(str(page_num) + ' (' + results[page_num]['skipped'] + ')' for page_num in skipped_pages)}.")
+        if journal is not None:
+            print("If any of them has questions, run again with --resume --no-skip-pages to send only these "
+                  "pages (and any failed ones) to Gemini.")
+        else:
+            print("If any of them has questions, run again with --no-skip-pages.")
+
+    failed_pages = sorted(page_num for page_num, result in results.items() if result["failed"])
+    if failed_pages:
+        print(f"\nWARNING: {len(failed_pages)} page(s) failed permanently and are missing from the output: "
+              f"{', '.join(str(page_num) for page_num in failed_pages)}.")
+        if journal is not None:
+            print("Run again with --resume to retry only these pages.")
+    else:
+        print("\nAll pages were extracted successfully.")
+    return all_questions, answer_key, failed_pages, skipped_pages
+
+
+def parse_answer_key_spec(answer_key_input_type):
+    """
+    Interprets the answer key setting: a page number, 'bold' if answers are bolded in the
+    questions, or 0 for no answer key. Returns (answer_key_page_number, answers_are_bolded).
+    """
+    answer_key_input_type = str(answer_key_input_type).strip().lower()
+    if answer_key_input_type == 'bold':
+        print("INFO: Script will try to detect bolded correct answers within question pages.")
+        return 0, True
+    if answer_key_input_type.isdigit():
+        answer_key_page_number = int(answer_key_input_type)
+        if answer_key_page_number == 0:
+            print("INFO: No separate answer key page will be processed.")
+        else:
+            print(f"INFO: Answer key will be processed from page {answer_key_page_number}.")
+        return answer_key_page_number, False
+    print(
+        "WARNING: Invalid input for answer key page/type. Assuming no separate answer key page and answers are not bolded.")
+    return 0, False
+
+
+def extract_pdf(pdf_filename, total_questions_expected, answer_key_page_number=0, answers_are_bolded=False,
+                resume=False, use_text_layer=USE_TEXT_LAYER, pages_per_request=PAGES_PER_REQUEST,
+                stream_filename=None):
+    """
+    Extracts all questions of one PDF and writes <name>_extracted_questions.json.
+    With stream_filename, questions are also streamed there as pages finish (see QuestionStream).
+    Returns a summary dict with counts and timings (and 'error' if the PDF could not be processed).
+    """
+    started_at = time.time()
+    summary = {"file": pdf_filename, "pages": 0, "questions": 0, "questions_with_answer": 0,
+               "failed_pages": [], "skipped_pages": [], "output": None, "seconds": 0.0, "error": None}
+
+    try:
+        from pdf2image import pdfinfo_from_path
+        page_count = pdfinfo_from_path(pdf_filename, poppler_path=None)["Pages"]
+        print(f"PDF '{pdf_filename}' has {page_count} pages. Pages will be converted to images as they are processed.")
+    except Exception as e:
+        print(f"ERROR: Failed to read PDF info: {e}")
+        print("Ensure poppler is installed and in PATH, or specify poppler_path in convert_from_path.")
+        summary["error"] = f"Failed to read PDF info: {e}"
+        return summary
+    summary["pages"] = page_count
+
+    # --- Checkpoint journal ---
+    journal_filename = os.path.splitext(pdf_filename)[0] + "_journal.jsonl"
+    journal = PageJournal(journal_filename, {"total_questions": total_questions_expected,
+                                             "answer_key_page": answer_key_page_number,
+                                             "answers_are_bolded": answers_are_bolded})
+    completed_results = journal.load() if resume else {}
+    journal.open(resume=bool(completed_results))
+    print(f"INFO: Finished pages are journaled to '{journal_filename}'.")
+
+    # --- Text layer fast path ---
+    text_layer_pages = {}
+    if use_text_layer:
+        text_layer_pages = detect_text_layer_pages(pdf_filename, answer_key_page_number, answers_are_bolded)
+        if text_layer_pages:
+            print(f"INFO: {len(text_layer_pages)} page(s) have a usable text layer and will not be rendered: "
+                  f"{', '.join(str(page_num) for page_num in sorted(text_layer_pages))}.")
+
+    # --- Render and process pages concurrently ---
+    stream = None
+    if stream_filename:
+        stream = QuestionStream(stream_filename, answers_are_bolded)
+        stream.open()
+    try:
+        all_questions, answer_key, failed_pages, skipped_pages = extract_pages_concurrently(
+            iter_pages(pdf_filename, page_count, text_layer_pages, skip_pages=completed_results),
+            total_questions_expected, answer_key_page_number, answers_are_bolded,
+            journal=journal, completed_results=completed_results,
+            pages_per_request=max(1, pages_per_request), stream=stream)
+    except Exception as e:
+        # Rendering, classification, journal and output errors all end up here
+        print(f"ERROR: Page extraction failed: {type(e).__name__}: {e}")
+        summary["error"] = f"Page extraction failed: {type(e).__name__}: {e}"
+        summary["seconds"] = round(time.time() - started_at, 2)
+        if stream is not None:
+            stream.finish(error=summary["error"])
+        return summary
+    except KeyboardInterrupt:
+        if stream is not None:
+            stream.finish(error="interrupted")
+        raise
+    finally:
+        journal.close()
+    summary["failed_pages"] = failed_pages
+    summary["skipped_pages"] = skipped_pages
+    if stream is not None:
+        stream.finish(failed_pages)
+
+    # --- Add correct options to questions (only if not detected as bolded) ---
+    if not answers_are_bolded and answer_key:
+        print("\nAdding correct options to extracted questions from separate answer key...")
+        questions_with_answers_count = 0
+        for q in all_questions:
+            q_number = q.get("number")
+            if q_number is not None and q_number in answer_key:
+                q["correct_option"] = answer_key[q_number]
+                questions_with_answers_count += 1
+        print(f"Correct option added for {questions_with_answers_count} questions using separate answer key.")
+    elif not answers_are_bolded and not answer_key and len(all_questions) > 0 and answer_key_page_number != 0:
+        print(
+            "WARNING: Separate answer key was specified but is empty or was not processed. Correct options were not added.")
+    elif answers_are_bolded:
+        print("\nCorrect options were expected to be detected as bolded by Gemini within each question's JSON.")
+        # Optionally, count how many were successfully detected
+        bold_detected_count = sum(1 for q in all_questions if q.get('correct_option') is not None)
+        print(f"{bold_detected_count} questions have a 'correct_option' (presumably from bold detection).")
+
+    # --- Save to JSON file ---
+    unique_questions = []
+    if all_questions:
+        seen_numbers = set()
+        all_questions.sort(key=lambda x: x.get('number', float('inf')))
+        for q in all_questions:
+            q_num = q.get('number')
+            if q_num is not None and q_num not in seen_numbers:
+                unique_questions.append(q)
+                seen_numbers.add(q_num)
+            elif q_num is None:
+                print(f"WARNING: Question found without a number: {q.get('question', '')[:50]}...")
+
+        output_json_filename = os.path.splitext(pdf_filename)[0] + "_extracted_questions.json"
+        with open(output_json_filename, "w", encoding="utf-8") as f:
+            json.dump(unique_questions, f, ensure_ascii=False, indent=2)
+        print(f"\n{len(unique_questions)} unique questions extracted and saved to '{output_json_filename}'.")
+        summary["output"] = output_json_filename
+    else:
+        print("\nNo questions were extracted.")
+
+    summary["questions"] = len(unique_questions)
+    summary["questions_with_answer"] = sum(1 for q in unique_questions if q.get("correct_option") is not None)
+    summary["seconds"] = round(time.time() - started_at, 2)
+    return summary
+
+
+# --- Batch mode ---
+BATCH_PROCESSES = min(4, os.cpu_count() or 1)  # PDFs processed in parallel in batch mode
+
+
+def load_batch_jobs(batch_path, default_total_questions, default_answer_key):
+    """
+    Reads the PDFs to process from a directory (every *.pdf, using the default settings)
+    or from a CSV manifest with lines `filename,total_questions,answer_key`, where
+    answer_key is a page number, 'bold' or 0. Returns a list of job dicts.
+    """
+    jobs = []
+    if os.path.isdir(batch_path):
+        for filename in sorted(os.listdir(batch_path)):
+            if filename.lower().endswith('.pdf'):
+                jobs.append({"pdf_filename": os.path.join(batch_path, filename),
+                             "total_questions": default_total_questions, "answer_key": default_answer_key})
+        return jobs
+    base_dir = os.path.dirname(os.path.abspath(batch_path))
+    with open(batch_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith('#') or row[0].strip().lower() == 'filename':
+                continue
+            filename = row[0].strip()
+            total_questions = int(row[1]) if len(row) > 1 and row[1].strip() else default_total_questions
+            answer_key = row[2].strip() if len(row) > 2 and row[2].strip() else default_answer_key
+            jobs.append({"pdf_filename": os.path.join(base_dir, filename),
+                         "total_questions": total_questions, "answer_key": answer_key})
+    return jobs
+
+
+def current_settings():
+    """
+    The module's settings (UPPERCASE globals with plain values) as they are now, including
+    changes made at runtime, e.g. extractor.API_KEY set by a program using this module.
+    """
+    plain_types = (str, int, float, bool, type(None), list, tuple, dict)
+    return {name: value for name, value in globals().items() if name.isupper() and isinstance(value, plain_types)}
+
+
+def init_batch_worker(settings, shared_rate_limiter, cache_enabled, cache_refresh, skip_non_question_pages):
+    """
+    Process pool initializer. With the spawn start method (Windows, macOS) worker processes
+    re-import this module, so the parent's current settings are applied again and the
+    objects built from them are recreated. Every worker draws from the same request budget.
+    """
+    global api_rate_limiter, retry_scheduler, model_client
+    globals().update(settings)
+    api_rate_limiter = shared_rate_limiter
+    retry_scheduler = RetryScheduler(MAX_ATTEMPTS_PER_PAGE, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+    model_client = GeminiModelClient(GEMINI_MODEL_NAME, REQUEST_TIMEOUT_SECONDS, lambda: API_KEY)
+    response_cache.cache_dir = CACHE_DIR
+    response_cache.max_bytes = CACHE_MAX_BYTES
+    response_cache.enabled = cache_enabled
+    response_cache.refresh = cache_refresh
+    page_classifier.enabled = skip_non_question_pages
+
+
+def run_batch_job(job, resume, use_text_layer, pages_per_request):
+    answer_key_page_number, answers_are_bolded = parse_answer_key_spec(job["answer_key"])
+    if not job["total_questions"] or job["total_questions"] <= 0:
+        return {"file": job["pdf_filename"], "error": "Missing or invalid total number of questions."}
+    return extract_pdf(job["pdf_filename"], job["total_questions"], answer_key_page_number, answers_are_bolded,
+                       resume=resume, use_text_layer=use_text_layer, pages_per_request=pages_per_request)
+
+
+def run_batch(jobs, processes=BATCH_PROCESSES, resume=False, use_text_layer=USE_TEXT_LAYER,
+              pages_per_request=PAGES_PER_REQUEST, summary_filename=None, bank=None):
+    """
+    Processes the PDFs of a batch across a process pool. All processes share one rate
+    limiter (held by a multiprocessing manager), so REQUESTS_PER_MINUTE is a global budget.
+    With a QuestionBank, each PDF's questions are added to it as soon as the PDF is done.
+    """
+    print(f"Batch: {len(jobs)} PDF(s) with {processes} process(es), "
+          f"at most {REQUESTS_PER_MINUTE} requests per minute in total.")
+    started_at = time.time()
+    summaries = []
+    with multiprocessing.Manager() as manager:
+        shared_rate_limiter = TokenBucketRateLimiter(REQUESTS_PER_MINUTE, state=manager.dict(), lock=manager.Lock())
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_batch_worker,
+                                 initargs=(current_settings(), shared_rate_limiter, response_cache.enabled,
+                                           response_cache.refresh, page_classifier.enabled)) as executor:
+            futures = {executor.submit(run_batch_job, job, resume, use_text_layer, pages_per_request): job
+                       for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    summary = {"file": job["pdf_filename"], "error": f"{type(e).__name__}: {e}"}
+                if bank is not None and summary.get("output"):
+                    summary["bank"] = add_extracted_file(bank, summary["output"], os.path.basename(summary["file"]))
+                summaries.append(summary)
+                print(f"\n=== Finished {len(summaries)}/{len(jobs)}: '{summary['file']}' ===")
+
+    summaries.sort(key=lambda summary: summary["file"])
+    print_batch_summary(summaries, time.time() - started_at)
+    if summary_filename:
+        with open(summary_filename, "w", encoding="utf-8") as f:
+            json.dump({"seconds": round(time.time() - started_at, 2), "files": summaries}, f,
+                      ensure_ascii=False, indent=2)
+        print(f"Batch summary saved to '{summary_filename}'.")
+    return summaries
+
+
+def print_batch_summary(summaries, total_seconds):
+    print(f"\n{'file':<40}{'pages':>7}{'questions':>11}{'answered':>10}{'failed':>8}{'skipped':>9}{'seconds':>9}")
+    for summary in summaries:
+        name = os.path.basename(summary["file"])[:39]
+        if summary.get("error"):
+            print(f"{name:<40} ERROR: {summary['error']}")
+            continue
+        print(f"{name:<40}{summary['pages']:>7}{summary['questions']:>11}{summary['questions_with_answer']:>10}"
+              f"{len(summary['failed_pages']):>8}{len(summary['skipped_pages']):>9}{summary['seconds']:>9.1f}")
+    print(f"Total: {sum(summary.get('questions', 0) for summary in summaries)} questions from {len(summaries)} "
+          f"PDF(s) in {total_seconds:.1f} s.")
+
+
+def main():
+    # --- Command-line options ---
+    parser = argparse.ArgumentParser(description="Extract multiple-choice questions from a PDF with Gemini.")
+    parser.add_argument("pdf", nargs="?", help="PDF file to process (prompted for if omitted).")
+    parser.add_argument("--total-questions", type=int,
+                        help="Total number of questions in the PDF (default for batch mode).")
+    parser.add_argument("--answer-key",
+                        help="Answer key page number, 'bold' if answers are bolded, or 0 for no answer key.")
+    parser.add_argument("--batch", metavar="DIR_OR_MANIFEST",
+                        help="Process every PDF in a directory, or the PDFs listed in a CSV manifest "
+                             "(filename,total_questions,answer_key), without prompts.")
+    parser.add_argument("--processes", type=int, default=BATCH_PROCESSES,
+                        help="PDFs processed in parallel in batch mode.")
+    parser.add_argument("--summary", help="Where to write the batch summary report (JSON).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the Gemini response cache.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached Gemini responses and replace them with fresh ones.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip pages already recorded in the checkpoint journal of a previous run.")
+    parser.add_argument("--no-text-layer", action="store_true",
+                        help="Always send rendered page images, even for pages with a usable PDF text layer.")
+    parser.add_argument("--pages-per-request", type=int, default=PAGES_PER_REQUEST,
+                        help="Send up to this many consecutive question pages to Gemini in one request.")
+    parser.add_argument("--no-skip-pages", action="store_true",
+                        help="Send every page to Gemini, including pages pre-classified as blank or without questions.")
+    parser.add_argument("--stream", nargs="?", const="", metavar="JSONL",
+                        help="Also stream questions to a JSON lines file as pages finish, for automator.py "
+                             "--follow (default: <name>_stream.jsonl).")
+    parser.add_argument("--profile", nargs="?", const="", metavar="TRACE",
+                        help="Record per-stage timings, print a p50/p95 table and write a Chrome trace "
+                             "(default: <name>_profile.json; use a .jsonl name for JSON lines).")
+    parser.add_argument("--record-responses", metavar="JSONL",
+                        help="Append every Gemini response to a JSON lines file for later --replay runs.")
+    parser.add_argument("--bank", nargs="?", const=QUESTION_BANK_FILE, metavar="SQLITE",
+                        help=f"Also add the extracted questions to a SQLite question bank and mark near-duplicates "
+                             f"of questions from other PDFs (default: {QUESTION_BANK_FILE}).")
+    parser.add_argument("--replay", nargs="?", const="", metavar="JSONL",
+                        help="Answer requests offline from a --record-responses file instead of Gemini "
+                             "(without a file, synthetic questions are returned).")
+    args = parser.parse_args()
+    response_cache.enabled = not args.no_cache
+    response_cache.refresh = args.refresh
+    page_classifier.enabled = SKIP_NON_QUESTION_PAGES and not args.no_skip_pages
+    use_text_layer = USE_TEXT_LAYER and not args.no_text_layer
+
+    global model_client
+    if args.replay is not None:
+        model_client = ReplayModelClient(args.replay or None)
+        response_cache.enabled = False  # Cached responses would bypass the replay
+    if args.record_responses:
+        model_client = RecordingModelClient(model_client, args.record_responses)
+        response_cache.refresh = True  # Cache hits would not be recorded
+
+    if args.batch:
+        if args.replay is not None or args.record_responses:
+            print("WARNING: --replay and --record-responses are only supported for a single PDF and are "
+                  "ignored in batch mode.")
+            model_client = GeminiModelClient(GEMINI_MODEL_NAME, REQUEST_TIMEOUT_SECONDS, lambda: API_KEY)
+        if args.stream is not None:
+            print("WARNING: --stream is only supported for a single PDF and is ignored in batch mode.")
+        if args.profile is not None:
+            print("WARNING: --profile is only supported for a single PDF and is ignored in batch mode.")
+        jobs = load_batch_jobs(args.batch, args.total_questions, args.answer_key or "0")
+        if not jobs:
+            print(f"ERROR: No PDF files found in '{args.batch}'.")
+            exit()
+        summary_filename = args.summary or os.path.join(
+            args.batch if os.path.isdir(args.batch) else os.path.dirname(os.path.abspath(args.batch)),
+            "batch_summary.json")
+        bank = QuestionBank(args.bank) if args.bank else None
+        try:
+            run_batch(jobs, max(1, args.processes), args.resume, use_text_layer, args.pages_per_request,
+                      summary_filename, bank)
+        finally:
+            if bank is not None:
+                bank.print_stats()
+                bank.close()
+        return
+
+    # --- Main script settings ---
+    pdf_filename = args.pdf or input("Enter PDF filename (e.g., soalat.pdf): ")
+
+    total_questions_input = args.total_questions if args.total_questions is not None else input(
+        "Enter the total number of questions in the PDF (e.g., 60): ")
+    try:
+        TOTAL_QUESTIONS_EXPECTED = int(total_questions_input)
+        if TOTAL_QUESTIONS_EXPECTED <= 0:
+            print("ERROR: Invalid total number of questions. Please enter a positive number.")
+            exit()
+    except ValueError:
+        print("ERROR: Invalid input for total number of questions. Exiting.")
+        exit()
+
+    answer_key_input_type = args.answer_key if args.answer_key is not None else input(
+        "Enter answer key page number (e.g., 8) OR type 'bold' if answers are bolded in questions (or 0 if no answer key): ")
+    ANSWER_KEY_PAGE_NUMBER, ANSWERS_ARE_BOLDED = parse_answer_key_spec(answer_key_input_type)
+
+    output_folder = 'pages_output'
+    os.makedirs(output_folder, exist_ok=True)
+
+    profiler.enabled = args.profile is not None
+    if profiler.enabled:
+        profiler.output_path = args.profile or os.path.splitext(pdf_filename)[0] + "_profile.json"
+    stream_filename = None
+    if args.stream is not None:
+        stream_filename = args.stream or os.path.splitext(pdf_filename)[0] + "_stream.jsonl"
+    summary = extract_pdf(pdf_filename, TOTAL_QUESTIONS_EXPECTED, ANSWER_KEY_PAGE_NUMBER, ANSWERS_ARE_BOLDED,
+                          resume=args.resume, use_text_layer=use_text_layer,
+                          pages_per_request=args.pages_per_request, stream_filename=stream_filename)
+    if summary["error"]:
+        exit()
+    if args.bank and summary["output"]:
+        bank = QuestionBank(args.bank)
+        try:
+            add_extracted_file(bank, summary["output"], os.path.basename(pdf_filename))
+            bank.print_stats()
+        finally:
+            bank.close()
+
+    response_cache.print_stats()
+    retry_scheduler.print_stats()
+    if hasattr(model_client, "print_stats"):
+        model_client.print_stats()
+    profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import json
+import time
+import random
+import threading
+from collections import namedtuple
+
+
+# The text of a model response plus its token usage (None when the backend does not report it)
+ModelResponse = namedtuple("ModelResponse", ["text", "prompt_tokens", "output_tokens"])
+
+
+class QuotaExceededError(Exception):
+    """A quota (rate limit) error raised by a model client without the google libraries."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GeminiModelClient:
+    """
+    Sends generate_content requests to Gemini and asks for a JSON response. The
+    google.generativeai import, the API key configuration and the model object are all
+    done on the first request and reused by every later request and thread. `api_key` is
+    a key or a callable returning one, read at that first request; without a key, the
+    library's default (the GOOGLE_API_KEY environment variable) applies.
+
+    Every model client has the same interface: generate_json(contents, cache_key, what, page)
+    returns a ModelResponse. `cache_key` identifies the request content, `what` is
+    'questions' or 'answer key', and `page` is the page label used in log messages
+    (e.g. '7', or '7,8' for a batched request).
+    """
+
+    def __init__(self, model_name, timeout, api_key=None):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.api_key = api_key
+        self.model = None
+        self.generation_config = None
+        self.lock = threading.Lock()
+
+    def _get_model(self):
+        with self.lock:
+            if self.model is None:
+                import google.generativeai as genai
+                api_key = self.api_key() if callable(self.api_key) else self.api_key
+                if api_key:
+                    genai.configure(api_key=api_key)
+                self.model = genai.GenerativeModel(self.model_name)
+                self.generation_config = genai.types.GenerationConfig(response_mime_type="application/json")
+            return self.model
+
+    def generate_json(self, contents, cache_key=None, what="questions", page=""):
+        model = self._get_model()
+        response = model.generate_content(contents, generation_config=self.generation_config,
+                                          request_options={"timeout": self.timeout})
+        usage = getattr(response, "usage_metadata", None)
+        # response.text raises ValueError when the candidate was blocked or has no text
+        text = response.text.strip() if response and response.parts else ""
+        return ModelResponse(text, getattr(usage, "prompt_token_count", None),
+                             getattr(usage, "candidates_token_count", None))
+
+
+class RecordingModelClient:
+    """
+    Wraps another model client and appends every response it returns to a JSON lines
+    file: {"key", "what", "page", "text", "prompt_tokens", "output_tokens", "seconds"}.
+    The recording can be served again later by ReplayModelClient.
+    """
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.recorded = 0
+        self.lock = threading.Lock()
+
+    def generate_json(self, contents, cache_key=None, what="questions", page=""):
+        started = time.perf_counter()
+        response = self.inner.generate_json(contents, cache_key, what, page)
+        record = {"key": cache_key, "what": what, "page": page, "text": response.text,
+                  "prompt_tokens": response.prompt_tokens, "output_tokens": response.output_tokens,
+                  "seconds": round(time.perf_counter() - started, 3)}
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.recorded += 1
+        return response
+
+    def print_stats(self):
+        print(f"Recorded {self.recorded} model response(s) to '{self.path}'.")
+
+
+# --- Fake model settings ---
+FAKE_ERROR_KINDS = ('timeout', 'quota', 'empty_response', 'malformed_json')
+FAKE_QUESTIONS_PER_PAGE = 5  # Questions in a synthesized response for one page
+
+
+class ReplayModelClient:
+    """
+    Offline stand-in for Gemini. A request whose cache_key was recorded gets the recorded
+    text. Other requests get the recorded responses of the same kind in turn, or, without
+    a recording, a synthesized response: FAKE_QUESTIONS_PER_PAGE numbered questions per page
+    (with the 'page' field for batched requests), or an answer key for answer key pages.
+
+    Every request waits latency_ms (plus up to jitter_ms) and fails with probability
+    error_rate. Failures look like the real ones: 'timeout' raises TimeoutError, 'quota'
+    raises QuotaExceededError, 'empty_response' and 'malformed_json' return an empty or
+    invalid text. None of them needs google-api-core installed.
+    """
+
+    def __init__(self, path=None, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_kind='timeout',
+                 questions_per_page=FAKE_QUESTIONS_PER_PAGE, answer_key_size=60, seed=None):
+        if error_kind not in FAKE_ERROR_KINDS:
+            raise ValueError(f"Unknown error kind '{error_kind}' (expected one of {', '.join(FAKE_ERROR_KINDS)}).")
+        self.path = path
+        self.latency_seconds = latency_ms / 1000
+        self.jitter_seconds = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.questions_per_page = questions_per_page
+        self.answer_key_size = answer_key_size
+        self.random = random.Random(seed)
+        self.records = {}  # cache_key -> record
+        self.records_by_what = {}  # what -> list of records, for requests that were not recorded
+        self.next_record = {}  # what -> index of the next record handed out in turn
+        self.counts = {"replayed": 0, "reused": 0, "synthesized": 0, "errors": 0}
+        self.lock = threading.Lock()
+        if path:
+            self.load(path)
+
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial last line of an interrupted recording
+                if record.get("key"):
+                    self.records[record["key"]] = record
+                self.records_by_what.setdefault(record.get("what", "questions"), []).append(record)
+        print(f"INFO: {sum(len(records) for records in self.records_by_what.values())} recorded model "
+              f"response(s) loaded from '{path}'.")
+
+    def generate_json(self, contents, cache_key=None, what="questions", page=""):
+        with self.lock:
+            delay = self.latency_seconds + self.random.uniform(0, self.jitter_seconds)
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.counts["errors"] += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            return self._fail(what, page)
+
+        record = self.records.get(cache_key)
+        if record is not None:
+            self._count("replayed")
+        else:
+            with self.lock:
+                candidates = self.records_by_what.get(what)
+                if candidates:
+                    index = self.next_record.get(what, 0)
+                    self.next_record[what] = index + 1
+                    record = candidates[index % len(candidates)]
+            if record is not None:
+                self._count("reused")
+        if record is not None:
+            return ModelResponse(record["text"], record.get("prompt_tokens"), record.get("output_tokens"))
+        self._count("synthesized")
+        return ModelResponse(self.synthesize(what, page), None, None)
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _fail(self, what, page):
+        if self.error_kind == 'timeout':
+            raise TimeoutError(f"Simulated timeout for {what} on page {page}.")
+        if self.error_kind == 'quota':
+            raise QuotaExceededError(f"Simulated quota error for {what} on page {page}.", retry_after=1)
+        if self.error_kind == 'empty_response':
+            return ModelResponse("", None, None)
+        return ModelResponse("Simulated malformed response", None, None)
+
+    def synthesize(self, what, page):
+        if what == "answer key":
+            return json.dumps({str(number): (number - 1) % 4 + 1 for number in range(1, self.answer_key_size + 1)})
+        page_numbers = []
+        for part in str(page).split(","):
+            try:
+                page_numbers.append(int(part))
+            except ValueError:
+                continue
+        batched = len(page_numbers) > 1
+        questions = []
+        for page_num in page_numbers or [1]:
+            for index in range(self.questions_per_page):
+                number = (page_num - 1) * self.questions_per_page + index + 1
+                question = {"number": number,
+                            "question": f"متن سوال شماره {number} که برای آزمون سرعت ساخته شده است؟",
+                            "options": [f"گزینه {option} سوال {number}" for option in range(1, 5)],
+                            "correct_option": (number - 1) % 4 + 1}
+                if batched:
+                    question["page"] = page_num
+                questions.append(question)
+        return json.dumps(questions, ensure_ascii=False)
+
+    def print_stats(self):
+        print(f"Fake model: {self.counts['replayed']} replayed, {self.counts['reused']} reused from other "
+              f"requests, {self.counts['synthesized']} synthesized, {self.counts['errors']} simulated errors.")
@@ -0,0 +1,86 @@
+import re
+
+ZWNJ = '\u200c'  # Zero-width non-joiner (نیم‌فاصله)
+
+VERB_STEMS_FOR_MI_NE = (
+    r"روم|رود|روی|رویم|روید|روند|کنم|کند|کنی|کنیم|کنید|کنند|شوم|شود|شوی|شویم|شوید|شوند|"
+    r"دهم|دهد|دهی|دهیم|دهید|دهند|زنم|زند|زنی|زنیم|زنید|زنند|گیرم|گیرد|گیری|گیریم|گیرید|گیرند|"
+    r"گویم|گوید|گویی|گوییم|گویید|گویند|دارم|دارد|داری|داریم|دارید|دارند|باشم|باشد|باشی|باشیم|باشید|باشند|"
+    r"آیم|آید|آیی|آییم|آیید|آیند|توانم|تواند|توانی|توانیم|توانید|توانند|یابم|یابد|یابی|یابیم|یابید|یابند|"
+    r"سازم|سازد|سازی|سازیم|سازید|سازند|پذیرم|پذیرد|پذیری|پذیریم|پذیرید|پذیرند|گردم|گردد|گردی|گردیم|گردید|گردند|"
+    r"بینم|بیند|بینی|بینیم|بینید|بینند|دانم|داند|دانی|دانیم|دانید|دانند|نویسم|نویسد|نویسی|نویسیم|نویسید|نویسند|"
+    r"خوانم|خواند|خوانی|خوانیم|خوانید|خوانند|خواهم|خواهد|خواهی|خواهیم|خواهید|خواهند|برم|برد|بری|بریم|برید|برند"
+)
+
+# Substring replacements, applied anywhere in the text (also inside longer words)
+WORD_FIXES = {
+    'مییابد': 'می' + ZWNJ + 'یابد',
+    'میشود': 'می' + ZWNJ + 'شود',
+    'آنها': 'آن' + ZWNJ + 'ها',
+}
+
+
+class PersianTextNormalizer:
+    """
+    Fixes common spacing errors in Persian text (ZWNJ after «می»/«نمی» and before
+    «ها»/«ای») and converts Persian/Arabic digits to English ones.
+
+    All regular expressions are compiled once when the normalizer is created, and the
+    corrections are applied in two regex passes. normalize_many() normalizes a whole
+    batch of strings in one call.
+    """
+
+    def __init__(self, verb_stems=VERB_STEMS_FOR_MI_NE, word_fixes=None):
+        self.word_fixes = dict(WORD_FIXES if word_fixes is None else word_fixes)
+        word_alternatives = '|'.join(re.escape(word) for word in self.word_fixes)
+        # The leading lookahead lets the regex engine skip positions that cannot start a match
+        first_chars = ''.join(sorted({'م', 'ن'} | {word[0] for word in self.word_fixes}))
+        # Pass 1: «می»/«نمی» followed (with or without spaces) by a verb stem, or one of the word fixes
+        self.prefix_pattern = re.compile(r'(?=[' + re.escape(first_chars) + r'])'
+                                         r'(?:\b(می|نمی)\s*(' + verb_stems + r')\b|(' + word_alternatives + '))')
+        # Pass 2: whitespace before the «ها»/«ای» suffixes becomes a ZWNJ
+        self.suffix_pattern = re.compile(r'(?<=\S)\s+(?=(?:ها|ای)\b)')
+        self.digits_table = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+    def _fix_prefix(self, match):
+        word = match.group(3)
+        if word is not None:
+            return self.word_fixes[word]
+        return match.group(1) + ZWNJ + match.group(2)
+
+    def english_digits(self, text):
+        if not isinstance(text, str):
+            text = str(text)
+        return text.translate(self.digits_table)
+
+    def correct_spacing(self, text):
+        if not text:
+            return ""
+        text = self.prefix_pattern.sub(self._fix_prefix, text)
+        return self.suffix_pattern.sub(ZWNJ, text)
+
+    def normalize(self, text, english_digits=False):
+        text = self.correct_spacing(text)
+        return text.translate(self.digits_table) if english_digits else text
+
+    def normalize_many(self, texts, english_digits=False):
+        """Normalizes a batch of strings and returns the results in the same order."""
+        # Bound methods are looked up once; joining the batch into one string was slower
+        correct_spacing = self.correct_spacing
+        if english_digits:
+            digits_table = self.digits_table
+            return [correct_spacing(text).translate(digits_table) for text in texts]
+        return [correct_spacing(text) for text in texts]
+
+
+default_normalizer = PersianTextNormalizer()
+
+
+# --- Helper function to convert Persian/Arabic numerals ---
+def to_english_digits(text):
+    return default_normalizer.english_digits(text)
+
+
+# --- Post-processing function to correct common spacing errors ---
+def correct_common_spacing_errors(text):
+    return default_normalizer.correct_spacing(text)
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Lightweight span recorder shared by extractor.py and automator.py. When enabled,
+    every `with profiler.span(stage, ...)` block is recorded with its start time,
+    duration, thread and attributes (page or question number, bytes sent, token counts).
+    Spans can be exported as a Chrome trace (chrome://tracing, Perfetto) or as JSON lines,
+    and summarized per stage with p50/p95 durations. When disabled, span() costs only a
+    function call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_path = None  # Where report() writes the trace
+        self.spans = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Records the duration of the block; the yielded dict can be filled with more attributes."""
+        if not self.enabled:
+            yield attributes
+            return
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(stage, started, time.perf_counter() - started, **attributes)
+
+    def record(self, stage, started, seconds, **attributes):
+        """Adds a span measured elsewhere (started is a time.perf_counter() value)."""
+        if not self.enabled:
+            return
+        span = {"stage": stage, "start": started - self.origin, "seconds": seconds,
+                "pid": os.getpid(), "tid": threading.get_ident(),
+                "attributes": {key: value for key, value in attributes.items() if value is not None}}
+        with self.lock:
+            self.spans.append(span)
+
+    def write(self, path):
+        """Writes all spans to path: JSON lines if it ends in .jsonl, otherwise a Chrome trace."""
+        with self.lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for span in spans:
+                    f.write(json.dumps(span, ensure_ascii=False) + "\n")
+            else:
+                events = [{"name": span["stage"], "cat": span["stage"], "ph": "X",
+                           "ts": round(span["start"] * 1e6), "dur": round(span["seconds"] * 1e6),
+                           "pid": span["pid"], "tid": span["tid"], "args": span["attributes"]}
+                          for span in spans]
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        print(f"Profile with {len(spans)} spans written to '{path}'.")
+
+    def summary(self):
+        """Returns one row per stage: count, total/p50/p95/max seconds and summed numeric attributes."""
+        with self.lock:
+            spans = list(self.spans)
+        by_stage = {}
+        for span in spans:
+            by_stage.setdefault(span["stage"], []).append(span)
+        rows = []
+        for stage, stage_spans in by_stage.items():
+            durations = sorted(span["seconds"] for span in stage_spans)
+            totals = {}
+            for span in stage_spans:
+                for key, value in span["attributes"].items():
+                    if key in ("bytes", "bytes_sent", "prompt_tokens", "output_tokens"):
+                        totals[key] = totals.get(key, 0) + value
+            rows.append({"stage": stage, "count": len(durations), "total": sum(durations),
+                         "p50": percentile(durations, 50), "p95": percentile(durations, 95),
+                         "max": durations[-1], "totals": totals})
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            print("\nProfile: no spans were recorded.")
+            return
+        print(f"\n{'stage':<22}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}  totals")
+        for row in rows:
+            totals = ", ".join(f"{key}={value}" for key, value in sorted(row["totals"].items()))
+            print(f"{row['stage']:<22}{row['count']:>7}{row['total']:>10.2f}{row['p50'] * 1000:>10.1f}"
+                  f"{row['p95'] * 1000:>10.1f}{row['max'] * 1000:>10.1f}  {totals}")
+
+    def report(self):
+        """Prints the summary table and writes the trace to output_path, once."""
+        if not self.enabled or self.output_path is None:
+            return
+        self.print_summary()
+        self.write(self.output_path)
+        self.output_path = None
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    index = max(0, min(len(sorted_values) - 1, -(-len(sorted_values) * percent // 100) - 1))
+    return sorted_values[int(index)]
+
+
+profiler = Profiler()
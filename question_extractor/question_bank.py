@@ -0,0 +1,402 @@
+"""
+SQLite question bank shared by extractor.py (--bank) and automator.py (--bank).
+
+Every extracted question is stored once with its source PDF, a normalized copy of its
+text in an FTS5 index for searching, and a MinHash signature of its character shingles.
+The signatures are split into LSH bands that are indexed in their own table, so a new
+question is only compared with the few stored questions that share a band with it.
+A stored question whose estimated similarity reaches DUPLICATE_THRESHOLD is only a
+candidate: it is confirmed as a duplicate if both questions have the same options and
+the same correct answer (or, when an answer is missing, almost the same question text).
+Confirmed duplicates are kept but marked, and are not uploaded again.
+
+    python question_bank.py --import soalat_extracted_questions.json other_extracted_questions.json
+    python question_bank.py --search "سلسله صفویه"
+    python question_bank.py --duplicates
+"""
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+from array import array
+from .persian_text import to_english_digits
+
+QUESTION_BANK_FILE = "question_bank.sqlite"
+
+# --- Near-duplicate detection settings ---
+SHINGLE_SIZE = 5  # Characters per shingle of the normalized question and option texts
+MINHASH_SIZE = 64  # Values per MinHash signature (a power of two)
+LSH_BANDS = 16  # MINHASH_SIZE / LSH_BANDS signature values per band
+DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity from which a stored question is a duplicate candidate
+UNANSWERED_DUPLICATE_THRESHOLD = 0.95  # Question text similarity a candidate needs when an answer is missing
+# Changing the settings above requires rebuilding the bank
+
+ROWS_PER_BAND = MINHASH_SIZE // LSH_BANDS
+BIN_BITS = MINHASH_SIZE.bit_length() - 1
+VALUE_BITS = 52  # Bits of a shingle hash kept as its value; rotated values are offset above them
+
+# Arabic letter forms that Persian texts use interchangeably with the Persian ones
+MATCHING_TABLE = str.maketrans({'ي': 'ی', 'ى': 'ی', 'ئ': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا',
+                                'آ': 'ا', 'ؤ': 'و', '\u200c': ' ', 'ـ': ''})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    number INTEGER,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct_option INTEGER,
+    normalized TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    duplicate_of INTEGER REFERENCES questions(id),
+    similarity REAL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_source ON questions(source, number);
+CREATE INDEX IF NOT EXISTS questions_duplicate_of ON questions(duplicate_of);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions(id)
+);
+CREATE INDEX IF NOT EXISTS lsh_buckets_lookup ON lsh_buckets(band, bucket);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(question, options, tokenize='unicode61');
+"""
+
+
+def normalize_for_matching(text):
+    """
+    Lower-cased text with unified Persian/Arabic letters and digits, without diacritics,
+    ZWNJs and punctuation, so that differently typed copies of a question compare equal.
+    """
+    text = unicodedata.normalize('NFKC', to_english_digits(text or "")).translate(MATCHING_TABLE)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return re.sub(r'[\W_]+', ' ', text.lower()).strip()
+
+
+def question_shingles(normalized_text):
+    text = normalized_text.replace(' ', '')
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[index:index + SHINGLE_SIZE] for index in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(shingles):
+    """
+    One-permutation MinHash: every shingle is hashed once, the low bits of the hash pick
+    one of MINHASH_SIZE bins and each bin keeps its smallest value. Empty bins borrow the
+    value of the next filled bin (offset by the distance), so that two signatures still
+    agree on a bin with a probability equal to the Jaccard similarity of the shingle sets.
+    This costs one hash per shingle instead of one per shingle and permutation.
+    """
+    bins = [None] * MINHASH_SIZE
+    for shingle in shingles:
+        hashed = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        index = hashed & (MINHASH_SIZE - 1)
+        value = hashed >> (64 - VALUE_BITS)
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    if all(value is None for value in bins):
+        return [0] * MINHASH_SIZE
+    signature = []
+    for index in range(MINHASH_SIZE):
+        distance = 0
+        while bins[(index + distance) % MINHASH_SIZE] is None:
+            distance += 1
+        signature.append(bins[(index + distance) % MINHASH_SIZE] + (distance << VALUE_BITS))
+    return signature
+
+
+def lsh_buckets(signature):
+    """(band, bucket) pairs of a signature: one 32-bit hash per band of ROWS_PER_BAND values."""
+    return [(band, zlib.crc32(array('Q', signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]).tobytes()))
+            for band in range(LSH_BANDS)]
+
+
+def signature_from_blob(blob):
+    signature = array('Q')
+    signature.frombytes(blob)
+    return signature
+
+
+def estimated_similarity(signature, other_signature):
+    return sum(1 for a, b in zip(signature, other_signature) if a == b) / len(signature)
+
+
+def text_similarity(text, other_text):
+    """Exact Jaccard similarity of the shingles of two normalized texts."""
+    shingles, other_shingles = question_shingles(text), question_shingles(other_text)
+    return len(shingles & other_shingles) / max(1, len(shingles | other_shingles))
+
+
+def correct_option_text(options, correct_option):
+    """Normalized text of the correct option (correct_option counts from 1), or None if unknown."""
+    if isinstance(correct_option, int) and 1 <= correct_option <= len(options):
+        return options[correct_option - 1]
+    return None
+
+
+class QuestionBank:
+    """
+    Question store backed by one SQLite file. Safe to share between threads; writes from
+    several processes are serialized by SQLite's own locking.
+    """
+
+    def __init__(self, path=QUESTION_BANK_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def prepare(q_data):
+        """Returns (normalized text, content hash, signature) of a question dict."""
+        options = [str(option) for option in q_data.get('options') or []]
+        normalized = normalize_for_matching(" ".join([str(q_data.get('question', ""))] + options))
+        content_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return normalized, content_hash, minhash_signature(question_shingles(normalized))
+
+    def _find_similar(self, signature, threshold):
+        """[(question_id, similarity)] of stored questions at least `threshold` similar, best first."""
+        candidates = set()
+        for band, bucket in lsh_buckets(signature):
+            candidates.update(row[0] for row in self.connection.execute(
+                "SELECT question_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+        matches = []
+        candidates = sorted(candidates)
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start:start + 500]
+            for candidate_id, candidate_signature in self.connection.execute(
+                    f"SELECT id, signature FROM questions WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                similarity = estimated_similarity(signature, signature_from_blob(candidate_signature))
+                if similarity >= threshold:
+                    matches.append((candidate_id, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def _confirm_duplicate(self, q_data, candidate_id):
+        """
+        Whether the stored candidate is really a copy of q_data. Similar shingles alone also
+        match variants that differ only in a key word (e.g. the province asked about), so
+        the normalized options must be the same, and so must the correct answers. Without
+        two answers to compare, the question texts must be at least
+        UNANSWERED_DUPLICATE_THRESHOLD similar.
+        """
+        row = self.connection.execute("SELECT question, options, correct_option FROM questions WHERE id = ?",
+                                      (candidate_id,)).fetchone()
+        options = [normalize_for_matching(str(option)) for option in q_data.get('options') or []]
+        candidate_options = [normalize_for_matching(option) for option in json.loads(row["options"])]
+        if sorted(options) != sorted(candidate_options):
+            return False
+        answer = correct_option_text(options, q_data.get('correct_option'))
+        candidate_answer = correct_option_text(candidate_options, row["correct_option"])
+        if answer is not None and candidate_answer is not None:
+            return answer == candidate_answer
+        return text_similarity(normalize_for_matching(str(q_data.get('question', ""))),
+                               normalize_for_matching(row["question"])) >= UNANSWERED_DUPLICATE_THRESHOLD
+
+    def find_similar(self, q_data, threshold=DUPLICATE_THRESHOLD):
+        """
+        Stored questions similar to the question dict q_data, as [(question_id, similarity)].
+        These are duplicate candidates; add_questions() confirms them before marking.
+        """
+        _normalized, _content_hash, signature = self.prepare(q_data)
+        with self.lock:
+            return self._find_similar(signature, threshold)
+
+    def add_questions(self, questions, source):
+        """
+        Adds a list of question dicts (as written by extractor.py) in one transaction.
+        A question whose normalized text is already stored is not added again, but gets
+        its correct_option filled in if the stored copy has none. Returns the counts of
+        added, duplicate, already stored and answer-updated questions, and of similar
+        questions that were not confirmed as duplicates.
+        """
+        counts = {"added": 0, "duplicates": 0, "existing": 0, "answers_updated": 0, "similar": 0}
+        now = time.time()
+        prepared = [(q_data, *self.prepare(q_data)) for q_data in questions]
+        with self.lock, self.connection:
+            for q_data, normalized, content_hash, signature in prepared:
+                correct_option = q_data.get('correct_option')
+                existing = self.connection.execute("SELECT id, correct_option FROM questions WHERE content_hash = ?",
+                                                   (content_hash,)).fetchone()
+                if existing is not None:
+                    counts["existing"] += 1
+                    if existing["correct_option"] is None and correct_option is not None:
+                        self.connection.execute("UPDATE questions SET correct_option = ? WHERE id = ?",
+                                                (correct_option, existing["id"]))
+                        counts["answers_updated"] += 1
+                    continue
+                duplicate_of, similarity = None, None
+                matches = self._find_similar(signature, DUPLICATE_THRESHOLD)
+                for match_id, match_similarity in matches:
+                    if not self._confirm_duplicate(q_data, match_id):
+                        continue
+                    # Point at the original question rather than at another duplicate of it
+                    original = self.connection.execute("SELECT duplicate_of FROM questions WHERE id = ?",
+                                                       (match_id,)).fetchone()[0]
+                    duplicate_of = original if original is not None else match_id
+                    similarity = match_similarity
+                    counts["duplicates"] += 1
+                    break
+                else:
+                    if matches:
+                        counts["similar"] += 1
+                options = [str(option) for option in q_data.get('options') or []]
+                cursor = self.connection.execute(
+                    "INSERT INTO questions (content_hash, source, number, question, options, correct_option, "
+                    "normalized, signature, duplicate_of, similarity, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, source, q_data.get('number'), str(q_data.get('question', "")),
+                     json.dumps(options, ensure_ascii=False), correct_option, normalized,
+                     array('Q', signature).tobytes(), duplicate_of, similarity, now))
+                question_id = cursor.lastrowid
+                self.connection.executemany("INSERT INTO lsh_buckets (band, bucket, question_id) VALUES (?, ?, ?)",
+                                            [(band, bucket, question_id) for band, bucket in lsh_buckets(signature)])
+                self.connection.execute("INSERT INTO questions_fts (rowid, question, options) VALUES (?, ?, ?)",
+                                        (question_id, normalize_for_matching(q_data.get('question', "")),
+                                         normalize_for_matching(" ".join(options))))
+                counts["added"] += 1
+        return counts
+
+    @staticmethod
+    def _row_to_question(row):
+        return {"id": row["id"], "source": row["source"], "number": row["number"], "question": row["question"],
+                "options": json.loads(row["options"]), "correct_option": row["correct_option"],
+                "duplicate_of": row["duplicate_of"]}
+
+    def iter_questions(self, source=None, search=None, include_duplicates=False, answered_only=False, limit=None):
+        """
+        Yields stored questions as dicts in extractor.py's format (plus id, source and
+        duplicate_of), ordered by source and number. `source` is an SQL LIKE pattern on
+        the source name, `search` a full-text query (every word must occur).
+        """
+        conditions, parameters = self._filters(source, search, answered_only)
+        if not include_duplicates:
+            conditions.append("q.duplicate_of IS NULL")
+        query = "SELECT q.* FROM questions q"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY q.source, q.number, q.id"
+        if limit:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        for row in rows:
+            yield self._row_to_question(row)
+
+    def count_duplicates(self, source=None, search=None, answered_only=False):
+        """Number of questions marked as duplicates that iter_questions() with these filters leaves out."""
+        conditions, parameters = self._filters(source, search, answered_only)
+        conditions.append("q.duplicate_of IS NOT NULL")
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM questions q WHERE " + " AND ".join(conditions),
+                                           parameters).fetchone()[0]
+
+    @staticmethod
+    def _filters(source, search, answered_only):
+        conditions, parameters = [], []
+        if source:
+            conditions.append("q.source LIKE ?")
+            parameters.append(source)
+        if search:
+            words = normalize_for_matching(search).split()
+            if words:
+                conditions.append("q.id IN (SELECT rowid FROM questions_fts WHERE questions_fts MATCH ?)")
+                parameters.append(" ".join('"' + word.replace('"', '""') + '"' for word in words))
+        if answered_only:
+            conditions.append("q.correct_option IS NOT NULL")
+        return conditions, parameters
+
+    def duplicate_groups(self):
+        """[(original question, [its duplicates])] for every question that has duplicates."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT d.*, o.id AS original_id FROM questions d JOIN questions o ON o.id = d.duplicate_of "
+                "ORDER BY o.id, d.id").fetchall()
+            originals = {row["id"]: self._row_to_question(row) for row in self.connection.execute(
+                "SELECT * FROM questions WHERE id IN (SELECT DISTINCT duplicate_of FROM questions "
+                "WHERE duplicate_of IS NOT NULL)")}
+        groups = {}
+        for row in rows:
+            duplicate = self._row_to_question(row)
+            duplicate["similarity"] = row["similarity"]
+            groups.setdefault(row["original_id"], []).append(duplicate)
+        return [(originals[original_id], duplicates) for original_id, duplicates in groups.items()]
+
+    def stats(self):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT source), SUM(duplicate_of IS NOT NULL), "
+                "SUM(correct_option IS NOT NULL) FROM questions").fetchone()
+        return {"questions": row[0], "sources": row[1], "duplicates": row[2] or 0, "answered": row[3] or 0}
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"Question bank '{self.path}': {stats['questions']} questions from {stats['sources']} source(s), "
+              f"{stats['duplicates']} marked as duplicates, {stats['answered']} with a correct option.")
+
+
+def add_extracted_file(bank, json_filename, source=None):
+    """Adds the questions of an extractor.py output file to the bank and prints the counts."""
+    with open(json_filename, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    source = source or os.path.basename(json_filename).replace("_extracted_questions.json", ".pdf")
+    counts = bank.add_questions(questions, source)
+    answers_updated = f", {counts['answers_updated']} answer(s) filled in" if counts["answers_updated"] else ""
+    similar = (f"; {counts['similar']} similar question(s) with other options or answers were kept as new"
+               if counts["similar"] else "")
+    print(f"Question bank: {counts['added']} of {len(questions)} question(s) from '{source}' added "
+          f"({counts['duplicates']} near-duplicates of earlier questions), {counts['existing']} already "
+          f"stored{answers_updated}{similar}.")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the SQLite question bank.")
+    parser.add_argument("--bank", default=QUESTION_BANK_FILE, help="Question bank file.")
+    parser.add_argument("--import", dest="import_files", nargs="+", metavar="JSON",
+                        help="Add extractor.py output files to the bank.")
+    parser.add_argument("--search", help="Print the questions matching a full-text query.")
+    parser.add_argument("--source", help="Only questions whose source matches this SQL LIKE pattern.")
+    parser.add_argument("--duplicates", action="store_true", help="Print the groups of near-duplicate questions.")
+    parser.add_argument("--limit", type=int, default=50, help="Questions printed by --search.")
+    args = parser.parse_args()
+
+    bank = QuestionBank(args.bank)
+    try:
+        for json_filename in args.import_files or []:
+            add_extracted_file(bank, json_filename)
+        if args.search or (args.source and not args.duplicates):
+            for q_data in bank.iter_questions(source=args.source, search=args.search, include_duplicates=True,
+                                              limit=args.limit):
+                marker = f" (duplicate of #{q_data['duplicate_of']})" if q_data["duplicate_of"] else ""
+                print(f"#{q_data['id']} {q_data['source']} Q{q_data['number']}{marker}: {q_data['question'][:120]}")
+        if args.duplicates:
+            for original, duplicates in bank.duplicate_groups():
+                print(f"\n#{original['id']} {original['source']} Q{original['number']}: {original['question'][:120]}")
+                for duplicate in duplicates:
+                    print(f"    #{duplicate['id']} {duplicate['source']} Q{duplicate['number']} "
+                          f"({duplicate['similarity']:.0%} similar)")
+        bank.print_stats()
+    finally:
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Local stand-in for the question website, for trying automator.py without touching the
+real site. It serves a login page, the user panel and a CreateQuestion form with the
+same element IDs and classes as the real pages, checks the login cookie and the
+anti-forgery token on every post, and records the submitted questions.
+
+Like the real site, posting the create question form (ConfirmQuestionBtn) only stages
+the question in the session. The staged questions are stored when the "ذخیره سوالات
+تایید شده" (save confirmed questions) form is posted, and the page then shows a
+success message. Staged questions that are never saved are lost.
+
+    python stub_site.py --port 8000 --latency-ms 50
+    python automator.py questions.json --http --site http://127.0.0.1:8000
+
+The saved questions can be read back from /_stub/questions (JSON), and are also
+written to --output when the server stops. With --error-rate, that share of question
+posts is answered with 503 Service Unavailable instead, to exercise the retries.
+"""
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl, urlsplit
+from html import escape
+
+ANTIFORGERY_FIELD = "__RequestVerificationToken"
+ANTIFORGERY_COOKIE = "__RequestVerificationToken"
+SESSION_COOKIE = "StubAuth"
+CREATE_QUESTION_PREFIX = "/User/Lessons/CreateQuestion/"
+SAVE_QUESTIONS_PREFIX = "/User/Lessons/SaveConfirmedQuestions/"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Login</title></head><body>
+<form action="/Account/Login" method="post">
+<input type="hidden" name="{token_field}" value="{token}">
+<input id="UserName" name="UserName" type="text">
+<input id="Password" name="Password" type="password">
+<button class="LF_Submit_Btn" type="submit">ورود</button>
+</form></body></html>"""
+
+PANEL_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Panel</title></head><body>
+<a href="/User/Lessons">درس ها</a>
+</body></html>"""
+
+CREATE_QUESTION_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Create question</title></head><body>
+<a href="/User/Lessons">درس ها</a>
+{message}
+<form id="CreateQuestionForm" action="{action}" method="post">
+<input type="hidden" name="{token_field}" value="{token}">
+<input type="hidden" name="LessonId" value="{lesson_id}">
+<textarea id="QuestionText" name="QuestionText"></textarea>
+{options}
+<input id="search-tag-input" type="text">
+<button id="search-tag-button" type="button" onclick="searchTag()">جستجو</button>
+<div id="search-tag-list-container"></div>
+<div id="selected-tags"></div>
+<input id="SessionNumber" name="SessionNumber" type="text">
+<button id="ConfirmQuestionBtn" type="submit">ثبت سوال</button>
+</form>
+<form id="SaveConfirmedQuestionsForm" action="{save_action}" method="post">
+<input type="hidden" name="{token_field}" value="{token}">
+<span id="ConfirmedQuestionsCount">{staged}</span>
+<button id="SaveConfirmedQuestionsBtn" type="submit">ذخیره سوالات تایید شده</button>
+</form>
+<script>
+function searchTag() {{
+    var text = document.getElementById('search-tag-input').value;
+    fetch('/Tags/Search?term=' + encodeURIComponent(text)).then(function (response) {{
+        return response.json();
+    }}).then(function (tags) {{
+        var container = document.getElementById('search-tag-list-container');
+        container.innerHTML = '';
+        tags.forEach(function (tag) {{
+            var item = document.createElement('div');
+            var button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'tag-selector-item';
+            button.textContent = tag.name;
+            button.onclick = function () {{
+                var hidden = document.createElement('input');
+                hidden.type = 'hidden';
+                hidden.name = 'TagIds';
+                hidden.value = tag.id;
+                document.getElementById('selected-tags').appendChild(hidden);
+            }};
+            item.appendChild(button);
+            container.appendChild(item);
+        }});
+    }});
+}}
+</script>
+</body></html>"""
+
+OPTION_FIELDS = """<div class="Option">
+<input class="ChoiceInput" type="checkbox" name="Answers[{index}].IsCorrect" value="true">
+<input class="QuestionAnswer" type="text" name="Answers[{index}].Text">
+</div>"""
+
+
+class StubSite:
+    """State shared by all request handler threads."""
+
+    def __init__(self, latency_seconds=0.0, error_rate=0.0, seed=None):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.failed_posts = 0
+        self.sessions = set()
+        self.staged = {}  # session ID -> questions confirmed but not saved yet
+        self.tokens = {}  # anti-forgery cookie value -> form token
+        self.questions = []
+        self.saves = 0
+        self.rejected = 0
+        self.tags = {}  # tag name -> tag ID
+        self.tag_searches = 0
+        self.lock = threading.Lock()
+
+    def issue_token(self, cookie_token):
+        with self.lock:
+            return self.tokens.setdefault(cookie_token, secrets.token_urlsafe(24))
+
+    def should_fail(self):
+        with self.lock:
+            if self.random.random() >= self.error_rate:
+                return False
+            self.failed_posts += 1
+            return True
+
+    def tag_id(self, name):
+        with self.lock:
+            self.tag_searches += 1
+            return self.tags.setdefault(name, str(100 + len(self.tags)))
+
+    def tag_name(self, tag_id):
+        with self.lock:
+            return next((name for name, known_id in self.tags.items() if known_id == tag_id), None)
+
+    def token_is_valid(self, cookie_token, form_token):
+        with self.lock:
+            return cookie_token is not None and form_token is not None and \
+                self.tokens.get(cookie_token) == form_token
+
+
+class StubSiteHandler(BaseHTTPRequestHandler):
+    site = None  # Set by make_server
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet; the server prints its own summary
+
+    def cookies(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return {name: morsel.value for name, morsel in cookie.items()}
+
+    def send_page(self, status, body, set_cookies=(), content_type="text/html; charset=utf-8", location=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for cookie in set_cookies:
+            self.send_header("Set-Cookie", cookie)
+        if location:
+            self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def antiforgery_token(self, set_cookies):
+        cookie_token = self.cookies().get(ANTIFORGERY_COOKIE)
+        if cookie_token is None:
+            cookie_token = secrets.token_urlsafe(24)
+            set_cookies.append(f"{ANTIFORGERY_COOKIE}={cookie_token}; Path=/; HttpOnly")
+        return self.site.issue_token(cookie_token)
+
+    def is_logged_in(self):
+        return self.cookies().get(SESSION_COOKIE) in self.site.sessions
+
+    def session_id(self):
+        return self.cookies().get(SESSION_COOKIE)
+
+    def read_form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return parse_qsl(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        set_cookies = []
+        if path == "/_stub/questions":
+            with self.site.lock:
+                body = json.dumps(self.site.questions, ensure_ascii=False, indent=2)
+            self.send_page(200, body, content_type="application/json; charset=utf-8")
+        elif path == "/Tags/Search" and self.is_logged_in():
+            term = dict(parse_qsl(urlsplit(self.path).query)).get("term", "").strip()
+            tags = [{"id": self.site.tag_id(term), "name": term}] if term else []
+            self.send_page(200, json.dumps(tags, ensure_ascii=False), content_type="application/json; charset=utf-8")
+        elif path in ("/", "/Account/Login"):
+            token = self.antiforgery_token(set_cookies)
+            self.send_page(200, LOGIN_PAGE.format(token_field=ANTIFORGERY_FIELD, token=escape(token)), set_cookies)
+        elif not self.is_logged_in():
+            self.send_page(302, "", location="/")
+        elif path.startswith(CREATE_QUESTION_PREFIX):
+            token = self.antiforgery_token(set_cookies)
+            options = "\n".join(OPTION_FIELDS.format(index=index) for index in range(4))
+            lesson_id = path[len(CREATE_QUESTION_PREFIX):]
+            saved = dict(parse_qsl(urlsplit(self.path).query)).get("saved")
+            message = f'<div class="alert alert-success">{escape(saved)} سوال با موفقیت ذخیره شد.</div>' \
+                if saved else ""
+            with self.site.lock:
+                staged = len(self.site.staged.get(self.session_id(), []))
+            self.send_page(200, CREATE_QUESTION_PAGE.format(
+                action=escape(path), token_field=ANTIFORGERY_FIELD, token=escape(token), lesson_id=escape(lesson_id),
+                options=options, message=message, staged=staged,
+                save_action=escape(SAVE_QUESTIONS_PREFIX + lesson_id)), set_cookies)
+        else:
+            self.send_page(200, PANEL_PAGE)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        fields = self.read_form()
+        form = dict(fields)
+        cookie_token = self.cookies().get(ANTIFORGERY_COOKIE)
+        if not self.site.token_is_valid(cookie_token, form.get(ANTIFORGERY_FIELD)):
+            with self.site.lock:
+                self.site.rejected += 1
+            self.send_page(400, "Invalid anti-forgery token.")
+            return
+        if path == "/Account/Login":
+            if not form.get("UserName") or not form.get("Password"):
+                self.send_page(200, LOGIN_PAGE.format(token_field=ANTIFORGERY_FIELD,
+                                                      token=escape(form[ANTIFORGERY_FIELD])))
+                return
+            session_id = secrets.token_urlsafe(24)
+            with self.site.lock:
+                self.site.sessions.add(session_id)
+            self.send_page(302, "", [f"{SESSION_COOKIE}={session_id}; Path=/; HttpOnly"], location="/User")
+        elif path.startswith(CREATE_QUESTION_PREFIX):
+            if not self.is_logged_in():
+                self.send_page(302, "", location="/")
+                return
+            time.sleep(self.site.latency_seconds)
+            if self.site.should_fail():
+                self.send_page(503, "Service temporarily unavailable.")
+                return
+            question = {
+                "lesson": path[len(CREATE_QUESTION_PREFIX):],
+                "question": form.get("QuestionText", ""),
+                "options": [form.get(f"Answers[{index}].Text", "") for index in range(4)],
+                "correct_options": [index + 1 for index in range(4) if form.get(f"Answers[{index}].IsCorrect")],
+                "session_number": form.get("SessionNumber", ""),
+                "tags": [self.site.tag_name(value) or value for name, value in fields if name == "TagIds"],
+            }
+            with self.site.lock:
+                self.site.staged.setdefault(self.session_id(), []).append(question)
+            self.send_page(302, "", location=path)
+        elif path.startswith(SAVE_QUESTIONS_PREFIX):
+            if not self.is_logged_in():
+                self.send_page(302, "", location="/")
+                return
+            time.sleep(self.site.latency_seconds)
+            with self.site.lock:
+                staged = self.site.staged.pop(self.session_id(), [])
+                self.site.questions.extend(staged)
+                self.site.saves += 1
+            self.send_page(302, "", location=f"{CREATE_QUESTION_PREFIX}{path[len(SAVE_QUESTIONS_PREFIX):]}"
+                                              f"?saved={len(staged)}")
+        else:
+            self.send_page(404, "Not found.")
+
+
+def make_server(host="127.0.0.1", port=8000, latency_seconds=0.0, error_rate=0.0, seed=None):
+    site = StubSite(latency_seconds, error_rate, seed)
+    handler = type("BoundStubSiteHandler", (StubSiteHandler,), {"site": site})
+    return ThreadingHTTPServer((host, port), handler), site
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the question website.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every question post.")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of question posts answered with 503 (0 to 1).")
+    parser.add_argument("--output", help="Write the received questions to this JSON file on exit.")
+    args = parser.parse_args()
+
+    server, site = make_server(args.host, args.port, args.latency_ms / 1000, args.error_rate)
+    print(f"Stub site listening on http://{args.host}:{args.port}/ (Ctrl-C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    unsaved = sum(len(staged) for staged in site.staged.values())
+    print(f"\n{len(site.questions)} question(s) saved in {site.saves} save(s), {unsaved} confirmed but never "
+          f"saved, {site.rejected} post(s) rejected, "
+          f"{site.failed_posts} post(s) failed on purpose, {site.tag_searches} tag search(es).")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(site.questions, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
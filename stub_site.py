@@ -0,0 +1,12 @@
+"""
+Command-line entry point of the local stand-in site. The code lives in
+question_extractor/stub_site.py; this script runs its main(), and `import stub_site`
+keeps returning that module.
+"""
+import sys
+from question_extractor import stub_site
+
+if __name__ == "__main__":
+    stub_site.main()
+else:
+    sys.modules[__name__] = stub_site